@@ -1,25 +1,67 @@
 __version__ = '26.0.2dev'
 
-from face.parser import (Flag,
-                         FlagDisplay,
-                         ERROR,
-                         Parser,
-                         PosArgSpec,
-                         PosArgDisplay,
-                         CommandParseResult)
-
-from face.errors import (FaceException,
-                         CommandLineError,
-                         ArgumentParseError,
-                         UnknownFlag,
-                         DuplicateFlag,
-                         InvalidSubcommand,
-                         InvalidFlagArgument,
-                         UsageError)
-
-from face.parser import (ListParam, ChoicesParam)
-from face.command import Command, CommandGroup
-from face.middleware import face_middleware
-from face.helpers import HelpHandler, StoutHelpFormatter
-from face.testing import CommandChecker, CheckError
-from face.utils import echo, echo_err, prompt, prompt_secret, flush_stdin, prompt_yn
+import importlib
+
+# public name -> module defining it. names are imported on first
+# access (see __getattr__ below), so that, e.g., parsing-only
+# programs don't pay for importing help formatting and testing tools.
+_LAZY_EXPORTS = {'Flag': 'face.parser',
+                 'FlagDisplay': 'face.parser',
+                 'Parser': 'face.parser',
+                 'PosArgSpec': 'face.parser',
+                 'PosArgDisplay': 'face.parser',
+                 'CommandParseResult': 'face.parser',
+                 'ListParam': 'face.parser',
+                 'ChoicesParam': 'face.parser',
+                 'FilePathParam': 'face.parser',
+                 'GlobParam': 'face.parser',
+                 'InputFileParam': 'face.parser',
+                 'StdinParam': 'face.parser',
+                 'OutputFileParam': 'face.parser',
+                 'FileValueParam': 'face.parser',
+
+                 'FaceException': 'face.errors',
+                 'CommandLineError': 'face.errors',
+                 'ArgumentParseError': 'face.errors',
+                 'UnknownFlag': 'face.errors',
+                 'DuplicateFlag': 'face.errors',
+                 'InvalidSubcommand': 'face.errors',
+                 'InvalidFlagArgument': 'face.errors',
+                 'UsageError': 'face.errors',
+
+                 'Command': 'face.command',
+                 'CommandGroup': 'face.command',
+                 'face_middleware': 'face.middleware',
+                 'face_provider': 'face.middleware',
+                 'face_resource': 'face.middleware',
+                 'lazy': 'face.middleware',
+                 'cache_middleware': 'face.cache',
+                 'incremental_middleware': 'face.cache',
+                 'HelpHandler': 'face.helpers',
+                 'StoutHelpFormatter': 'face.helpers',
+                 'CommandChecker': 'face.testing',
+                 'CheckError': 'face.testing',
+
+                 'ERROR': 'face.utils',
+                 'echo': 'face.utils',
+                 'echo_err': 'face.utils',
+                 'prompt': 'face.utils',
+                 'prompt_secret': 'face.utils',
+                 'flush_stdin': 'face.utils',
+                 'prompt_yn': 'face.utils'}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module_name = _LAZY_EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value  # skip __getattr__ next time
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -0,0 +1,436 @@
+import io
+import os
+import sys
+import json
+import pickle
+import hashlib
+import inspect
+import tempfile
+import threading
+import contextlib
+import contextvars
+
+from boltons.iterutils import unique
+
+from face.parser import Flag
+from face.middleware import face_middleware
+
+
+_CACHE_FORMAT = 1
+_CACHE_SUFFIX = '.face-cache'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def get_file_fingerprint(path, content_hash=False):
+    """Returns a tuple identifying the state of the file at *path*: its
+    absolute path, size, and modification time, plus a SHA-256 hex
+    digest of its contents if *content_hash* is True. Missing files
+    get a fingerprint of ``(abspath, None, None)``.
+    """
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (path, None, None)
+    ret = (path, stat.st_size, stat.st_mtime_ns)
+    if content_hash:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        ret += (digest.hexdigest(),)
+    return ret
+
+
+def _get_input_paths(inputs, flags, posargs):
+    ret = []
+    for name in inputs:
+        if name == 'posargs_':
+            value = posargs
+        else:
+            value = (flags or {}).get(name)
+        if value is None:
+            continue
+        if isinstance(value, (str, bytes, os.PathLike)):
+            ret.append(value)
+        else:
+            ret.extend(value)
+    return ret
+
+
+def _atomic_write(path, data):
+    dir_name = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=dir_name, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# the capture buffers of invocations being cached in the current
+# thread or task, innermost last. see _capture_stdout()
+_CAPTURES = contextvars.ContextVar('face_cache_captures', default=())
+_TEE_LOCK = threading.Lock()
+_tee_users = 0
+
+
+class _TeeWriter(io.TextIOBase):
+    # installed as sys.stdout while any invocation is being cached.
+    # writes through to the real stream, keeping a copy for the
+    # invocations running in the current context, so that concurrent
+    # threads and tasks only capture their own output.
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        for captured in _CAPTURES.get():
+            captured.write(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def isatty(self):
+        try:
+            return self.stream.isatty()
+        except Exception:
+            return False
+
+    @property
+    def encoding(self):
+        return getattr(self.stream, 'encoding', 'utf-8')
+
+
+@contextlib.contextmanager
+def _capture_stdout():
+    # sys.stdout is process-global, so it's only swapped out by the
+    # first of any concurrent captures, and restored by the last
+    global _tee_users
+    captured = io.StringIO()
+    token = _CAPTURES.set(_CAPTURES.get() + (captured,))
+    with _TEE_LOCK:
+        if not isinstance(sys.stdout, _TeeWriter):
+            sys.stdout = _TeeWriter(sys.stdout)
+        _tee_users += 1
+    try:
+        yield captured
+    finally:
+        _CAPTURES.reset(token)
+        with _TEE_LOCK:
+            _tee_users -= 1
+            if not _tee_users and isinstance(sys.stdout, _TeeWriter):
+                sys.stdout = sys.stdout.stream
+
+
+class ResultCache:
+    """A size-bounded, on-disk store of command results, evicting the
+    least-recently used entries first. Used by
+    :func:`cache_middleware`.
+
+    Args:
+       cache_dir (str): Directory to store entries in. Created if it
+          does not exist.
+       max_bytes (int): The maximum total size of all entries.
+          Defaults to 64MB.
+    """
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_bytes = max_bytes
+
+    def _get_path(self, key):
+        return os.path.join(self.cache_dir, key + _CACHE_SUFFIX)
+
+    def get(self, key):
+        """Returns the stored ``(output, value)`` pair for *key*, or
+        ``None`` on a miss."""
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                fmt, output, value = pickle.load(f)
+        except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+            return None
+        if fmt != _CACHE_FORMAT:
+            return None
+        try:
+            os.utime(path)  # bump for LRU
+        except OSError:
+            pass
+        return output, value
+
+    def set(self, key, output, value):
+        """Store *output* and *value* under *key*, returning False if
+        the value could not be pickled or stored."""
+        try:
+            data = pickle.dumps((_CACHE_FORMAT, output, value), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False  # unpicklable return values are simply not cached
+        if len(data) > self.max_bytes:
+            return False
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            _atomic_write(self._get_path(key), data)
+        except OSError:
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        "Remove least-recently used entries until under *max_bytes*."
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith(_CACHE_SUFFIX)]
+        except OSError:
+            return
+        entries, total = [], 0
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+        return
+
+    def clear(self):
+        "Remove all entries."
+        self.max_bytes, max_bytes = 0, self.max_bytes
+        try:
+            self.evict()
+        finally:
+            self.max_bytes = max_bytes
+
+    def __repr__(self):
+        cn = self.__class__.__name__
+        return f'{cn}({self.cache_dir!r}, max_bytes={self.max_bytes!r})'
+
+
+def get_invocation_key(subcmds, flags, posargs, post_posargs, fingerprints=(),
+                       name=None, ignore=()):
+    """Returns a hex digest identifying a normalized invocation: the
+    command *name* and subcommand path, resolved flag values,
+    positional arguments, and any input file fingerprints. Flags are
+    keyed by name, so ordering on the command line doesn't matter.
+    Flags named in *ignore*, like a middleware's own flags, are left
+    out.
+    """
+    flag_items = sorted([(k, v) for k, v in (flags or {}).items()
+                         if k not in ignore])
+    parts = (_CACHE_FORMAT, name, tuple(subcmds or ()), flag_items,
+             tuple(posargs or ()), tuple(post_posargs or ()), tuple(fingerprints))
+    return hashlib.sha256(repr(parts).encode('utf8')).hexdigest()
+
+
+def cache_middleware(cache_dir, max_bytes=DEFAULT_MAX_BYTES, inputs=(), content_hash=False):
+    """Create a middleware which caches the results of idempotent
+    commands, replaying captured stdout and the return value when the
+    same command is run again with the same arguments.
+
+    Args:
+       cache_dir (str): Directory to store cached results in.
+       max_bytes (int): The maximum total size of the cache, beyond
+          which least-recently used entries are evicted. Defaults to 64MB.
+       inputs (list): Names of flags whose values are input file
+          paths, or ``'posargs_'`` for positional arguments. Changes
+          to the size or modification time of these files invalidate
+          the cached result.
+       content_hash (bool): Also hash the contents of input files,
+          for filesystems with unreliable modification times.
+          Defaults to False.
+
+    Adds two flags to any Command using it: ``--no-cache`` to bypass
+    the cache entirely, and ``--refresh`` to rerun the command and
+    overwrite the cached result. Return values which can't be pickled
+    and raised exceptions are not cached. Async handlers are cached
+    once awaited.
+    """
+    cache = ResultCache(cache_dir, max_bytes=max_bytes)
+    inputs = list(inputs)
+    flags = [Flag('--no-cache', parse_as=True, doc='bypass the result cache'),
+             Flag('--refresh', parse_as=True, doc='rerun and refresh the cached result')]
+    own_flag_names = [f.name for f in flags]
+
+    async def _await_and_cache(key, awaitable):
+        with _capture_stdout() as captured:
+            ret = await awaitable
+        cache.set(key, captured.getvalue(), ret)
+        return ret
+
+    @face_middleware(flags=flags)
+    def cache_mw(next_, no_cache, refresh, command_, subcmds_, posargs_, post_posargs_,
+                 flags_=None):
+        if no_cache:
+            return next_()
+        input_paths = _get_input_paths(inputs, flags_, posargs_)
+        fingerprints = [get_file_fingerprint(p, content_hash=content_hash) for p in input_paths]
+        key = get_invocation_key(subcmds_, flags_, posargs_, post_posargs_, fingerprints,
+                                 name=command_.name, ignore=own_flag_names)
+        if not refresh:
+            hit = cache.get(key)
+            if hit is not None:
+                output, value = hit
+                if output:
+                    sys.stdout.write(output)
+                    sys.stdout.flush()
+                return value
+
+        with _capture_stdout() as captured:
+            ret = next_()
+        if inspect.isawaitable(ret):
+            # async handlers only run, and print, once awaited
+            return _await_and_cache(key, ret)
+        cache.set(key, captured.getvalue(), ret)
+        return ret
+
+    cache_mw.cache = cache
+    return cache_mw
+
+
+class _StateDB:
+    # small JSON file mapping keys to the last successful run's state
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('format') != _CACHE_FORMAT:
+            return {}
+        return data.get('entries', {})
+
+    def get(self, key):
+        return self.load().get(key)
+
+    def set(self, key, value):
+        entries = self.load()  # reread to keep other processes' updates
+        entries[key] = value
+        data = json.dumps({'format': _CACHE_FORMAT, 'entries': entries}, sort_keys=True)
+        dir_name = os.path.dirname(self.path)
+        try:
+            os.makedirs(dir_name, exist_ok=True)
+            _atomic_write(self.path, data.encode('utf8'))
+        except OSError:
+            return False
+        return True
+
+
+def _get_role_paths(command, subcmds, flags, posargs, post_posargs):
+    inputs, outputs = [], []
+
+    def _add(parse_as, value):
+        role = getattr(parse_as, 'role', None)
+        if role is None or value is None:
+            return
+        paths = outputs if role == 'output' else inputs
+        if isinstance(value, (str, bytes, os.PathLike)):
+            paths.append(value)
+        else:
+            paths.extend(value)
+
+    for flag in unique(command.get_flag_map(subcmds).values()):
+        _add(flag.parse_as, (flags or {}).get(flag.name))
+    subcommand = command.subprs_map[subcmds] if subcmds else command
+    _add(subcommand.posargs.parse_as, posargs)
+    _add(subcommand.post_posargs.parse_as, post_posargs)
+    return inputs, outputs
+
+
+def _is_up_to_date(inputs, outputs):
+    # make-style: every output exists and is newer than every input
+    try:
+        oldest_output = min([os.stat(p).st_mtime_ns for p in outputs])
+    except OSError:
+        return False
+    for path in inputs:
+        try:
+            if os.stat(path).st_mtime_ns > oldest_output:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def incremental_middleware(state_path, content_hash=False):
+    """Create a middleware which skips the handler, make-style, when a
+    command's outputs are already up to date.
+
+    Input and output paths are found by their parser: any flag or
+    positional argument parsed by a :class:`~face.FilePathParam` with
+    ``role='input'`` or ``role='output'``. The handler is skipped, and
+    None returned, when every output exists and is newer than every
+    input, and the inputs and flags are unchanged since the last
+    successful run, as recorded in a small JSON database at
+    *state_path*. Commands without output paths always run.
+
+    Args:
+       state_path (str): Path of the file used to store the state of
+          previous runs.
+       content_hash (bool): Compare input files by size and content
+          hash instead of modification time, so that touched but
+          unchanged inputs don't trigger a rerun. Defaults to False.
+
+    Adds a ``--force`` flag, which runs the handler regardless.
+    """
+    state_db = _StateDB(state_path)
+    flags = [Flag('--force', parse_as=True, doc='run even if outputs are up to date')]
+    own_flag_names = [f.name for f in flags]
+
+    def _get_fingerprint(path):
+        fp = get_file_fingerprint(path, content_hash=content_hash)
+        if content_hash:
+            fp = fp[:2] + fp[3:]  # drop the mtime
+        return list(fp)
+
+    def _record(key, state, outputs):
+        if all([os.path.exists(p) for p in outputs]):
+            state_db.set(key, state)
+
+    async def _await_and_record(awaitable, key, state, outputs):
+        ret = await awaitable
+        _record(key, state, outputs)
+        return ret
+
+    @face_middleware(flags=flags)
+    def incremental_mw(next_, force, command_, subcmds_, posargs_, post_posargs_, flags_=None):
+        inputs, outputs = _get_role_paths(command_, subcmds_, flags_, posargs_, post_posargs_)
+        if not outputs:
+            return next_()
+        outputs = sorted({os.path.abspath(p) for p in outputs})
+        key_parts = (command_.name, tuple(subcmds_ or ()), outputs)
+        key = hashlib.sha256(repr(key_parts).encode('utf8')).hexdigest()
+        state = {'args': get_invocation_key(subcmds_, flags_, posargs_, post_posargs_,
+                                            name=command_.name, ignore=own_flag_names),
+                 'inputs': [_get_fingerprint(p) for p in inputs]}
+
+        if not force and state_db.get(key) == state:
+            if content_hash:
+                if all([os.path.exists(p) for p in outputs]):
+                    return None
+            elif _is_up_to_date(inputs, outputs):
+                return None
+
+        ret = next_()
+        if inspect.isawaitable(ret):
+            return _await_and_record(ret, key, state, outputs)
+        _record(key, state, outputs)
+        return ret
+
+    incremental_mw.state_db = state_db
+    return incremental_mw
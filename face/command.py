@@ -1,17 +1,23 @@
 import sys
+import time
 from collections import OrderedDict
 from typing import Callable, List, Optional, Union
 
-from face.utils import unwrap_text, get_rdep_map, echo
+from face.utils import unwrap_text, get_rdep_map, echo, normalize_flag_name
 from face.errors import ArgumentParseError, CommandLineError, UsageError
-from face.parser import Parser, Flag, PosArgSpec
+from face.parser import Parser, Flag, PosArgSpec, CommandParseResult, _dispatch_scope
 from face.helpers import HelpHandler
+from face.sinter import is_async_callable
 from face.middleware import (inject,
                              get_arg_names,
+                             get_fb,
                              is_middleware,
                              face_middleware,
                              check_middleware,
                              get_middleware_chain,
+                             group_providers,
+                             ResourceMiddleware,
+                             is_middleware_active,
                              _BUILTIN_PROVIDES)
 
 from boltons.strutils import camel2under
@@ -125,6 +131,16 @@ class Command(Parser):
         group: An optional string group name for display
            in help output. See CommandGroup for the recommended way
            to group multiple subcommands.
+        defer_conversion: Convert flag values only when they're first
+           used, instead of at parse time. See :class:`Parser`.
+        parse_cache_size: The number of distinct argument lists
+           whose parse results are cached. Defaults to 0, disabled.
+           See :class:`Parser`.
+        version: Adds a ``--version`` flag which prints the command
+           name and version, then exits. Pass a string, a callable
+           returning a string, or True to look up the version of the
+           installed distribution providing *func*. Callables and
+           lookups are only called when the flag is used.
     """
     def __init__(self, 
                  func: Optional[Callable],
@@ -137,10 +153,18 @@ class Command(Parser):
                  flagfile: bool = True,
                  help: Union[bool, HelpHandler] = DEFAULT_HELP_HANDLER,
                  middlewares: Optional[List[Callable]] = None,
-                 group: Optional[str] = None) -> None:
+                 group: Optional[str] = None,
+                 defer_conversion: bool = False,
+                 parse_cache_size: int = 0,
+                 version: Union[None, bool, str, Callable[[], str]] = None) -> None:
         name = name if name is not None else _get_default_name(func)
-        if doc is None:
-            doc = _docstring_to_doc(func)
+
+        # path -> key of the currently-compiled chain, see prepare()
+        self._path_chain_key_map = {}
+        # path -> memoized result of get_dep_names()
+        self._path_dep_names_map = {}
+        # path -> {inactive middlewares: chain}, see _get_wrapped()
+        self._path_variant_map = {}
 
         # TODO: default posargs if none by inspecting func
         super().__init__(name, doc,
@@ -148,9 +172,13 @@ class Command(Parser):
                         posargs=posargs,
                         post_posargs=post_posargs,
                         flagfile=flagfile,
-                        group=group)
+                        group=group,
+                        defer_conversion=defer_conversion,
+                        parse_cache_size=parse_cache_size)
 
         self.help_handler = help
+        self.version = version
+        self.version_flag = None
 
         # TODO: if func is callable, check that "next_" isn't taken
         self._path_func_map = OrderedDict()
@@ -172,6 +200,10 @@ class Command(Parser):
             if help.subcmd:
                 self.add(help.func, help.subcmd)  # for 'help' as a subcmd
 
+        if version:
+            self.version_flag = Flag('--version', parse_as=True, doc='show version and exit')
+            self.add(self.version_flag)
+
         if not func and not help:
             raise ValueError('Command requires a handler function or help handler'
                              ' to be set, not: %r' % func)
@@ -182,6 +214,18 @@ class Command(Parser):
     def func(self):
         return self._path_func_map[()]
 
+    @property
+    def doc(self):
+        # defaults to the first line of the handler's docstring,
+        # unwrapped on first access, as most runs never display it
+        if self._doc is None:
+            self._doc = _docstring_to_doc(self.func)
+        return self._doc
+
+    @doc.setter
+    def doc(self, doc):
+        self._doc = doc
+
     def add(self, *a, **kw):
         """Add a flag, subcommand, or middleware to this Command.
 
@@ -227,6 +271,7 @@ class Command(Parser):
         if not isinstance(flag, Flag):
             flag = Flag(*a, **kw)  # attempt to construct a Flag from arguments
         super().add(flag)
+        self._clear_caches()
 
         return flag
 
@@ -248,6 +293,7 @@ class Command(Parser):
                 self._path_func_map[path] = subcmd._path_func_map[path[1:]]
                 sub_mw = subcmd._path_mw_map[path[1:]]
                 self._path_mw_map[path] = self_mw + sub_mw  # TODO: check for conflicts
+        self._clear_caches()
         return
 
     def add_command_group(self, group):
@@ -279,8 +325,51 @@ class Command(Parser):
         for path, mws in self._path_mw_map.items():
             self._path_mw_map[path] = [mw] + mws  # TODO: check for conflicts
 
+        self._clear_caches()
+        return
+
+    def close(self):
+        """Close all resources held by this Command's middlewares, such
+        as the pools created by :func:`face_resource`. A Command can
+        also be used as a context manager, which calls this method on
+        exit.
+
+        Closing does not disable the Command; subsequent runs create
+        fresh resources as needed.
+        """
+        seen = set()
+        for mws in self._path_mw_map.values():
+            for mw in mws:
+                if id(mw) in seen:
+                    continue
+                seen.add(id(mw))
+                if isinstance(mw, ResourceMiddleware):
+                    mw.close()
         return
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _clear_caches(self):
+        # called whenever flags, subcommands, or middlewares change
+        super()._clear_caches()
+        self._path_chain_key_map.clear()
+        self._path_dep_names_map.clear()
+        self._path_variant_map.clear()
+
+    def _get_chain_key(self, path):
+        # everything that goes into a path's compiled middleware
+        # chain. if none of it has changed, neither has the chain.
+        prs = self.subprs_map[path] if path else self
+        return (self._path_func_map[path],
+                tuple(self._path_mw_map[path]),
+                prs.posargs.provides,
+                prs.post_posargs.provides,
+                tuple(self._path_flag_map[path]))
+
     # TODO: add_flag()
 
     def get_flag_map(self, path=(), with_hidden=True):
@@ -307,14 +396,23 @@ class Command(Parser):
             return OrderedDict(flag_map)
 
         return OrderedDict([(k, f) for k, f in flag_map.items() if f.name in dep_names
-                            or f is self.flagfile_flag or f is self.help_handler.flag])
+                            or f is self.flagfile_flag or f is self.help_handler.flag
+                            or f is self.version_flag])
 
     def get_dep_names(self, path=()):
         """Get a list of the names of all required arguments of a command (and
         any associated middleware).
 
         By specifying *path*, the same can be done for any subcommand.
+
+        Results are memoized per path until flags, subcommands, or
+        middlewares are added.
         """
+        try:
+            return list(self._path_dep_names_map[path])
+        except KeyError:
+            pass
+
         func = self._path_func_map[path]
         if not func:
             return []  # for when no handler is specified
@@ -324,21 +422,30 @@ class Command(Parser):
         # start out with all args of handler function, which gets stronger dependencies
         required_args = set(get_arg_names(func, only_required=False))
         dep_map = {func: set(required_args)}
+        labels = {func: 'handler'}
         for mw in mws:
             arg_names = set(get_arg_names(mw, only_required=True))
+            mw_label = 'provided by middleware ' + get_fb(mw).name
             for provide in mw._face_provides:
                 dep_map[provide] = arg_names
+                labels[provide] = mw_label
             if not mw._face_optional:
                 # all non-optional middlewares get their args required, too.
                 required_args.update(arg_names)
+            # a flag gating the middleware is used, even if nothing takes it
+            active_flag = getattr(getattr(mw, '_face_active', None), 'flag_name', None)
+            if active_flag:
+                required_args.add(active_flag)
 
-        rdep_map = get_rdep_map(dep_map)
+        rdep_map = get_rdep_map(dep_map, labels=labels)
 
         recursive_required_args = rdep_map[func].union(required_args)
 
-        return sorted(recursive_required_args)
+        ret = sorted(recursive_required_args)
+        self._path_dep_names_map[path] = ret
+        return list(ret)
 
-    def prepare(self, paths=None):
+    def prepare(self, paths=None, *, workers=None):
         """Compile and validate one or more subcommands to ensure all
         dependencies are met. Call this once all flags, subcommands,
         and middlewares have been added (using .add()).
@@ -348,41 +455,114 @@ class Command(Parser):
         conscientious users may want to call this method with no
         arguments to validate that all subcommands are ready for
         execution.
+
+        Compiled chains are cached per path, so repeated calls are
+        cheap. Adding flags, subcommands, or middlewares invalidates
+        the cache. Signature analysis of handlers and middlewares is
+        shared across all paths.
+
+        Args:
+           paths (list): Subcommand paths to prepare, as tuples of
+              subcommand names. Defaults to all paths.
+           workers (int): Validate paths across a thread pool of this
+              size. Defaults to preparing paths serially.
+
+        Returns an OrderedDict mapping each path compiled by this call
+        to the time taken to compile it, in seconds. Paths without
+        handlers and paths which were already compiled are omitted.
         """
         # TODO: also pre-execute help formatting to make sure all
         # values are sane there, too
         if paths is None:
             paths = self._path_func_map.keys()
+        paths = list(paths)
 
-        for path in paths:
-            func = self._path_func_map[path]
-            if func is None:
-                continue  # handled by run()
-
-            prs = self.subprs_map[path] if path else self
-            provides = []
-            if prs.posargs.provides:
-                provides += [prs.posargs.provides]
-            if prs.post_posargs.provides:
-                provides += [prs.post_posargs.provides]
-
-            deps = self.get_dep_names(path)
-            flag_names = [f.name for f in self.get_flags(path=path)]
-            all_mws = self._path_mw_map[path]
-
-            # filter out unused middlewares
-            mws = [mw for mw in all_mws if not mw._face_optional
-                   or [p for p in mw._face_provides if p in deps]]
-            provides += _BUILTIN_PROVIDES + flag_names
-            try:
-                wrapped = get_middleware_chain(mws, func, provides)
-            except NameError as ne:
-                ne.args = (ne.args[0] + f' (in path: {path!r})',)
-                raise
+        if workers and workers > 1 and len(paths) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self._prepare_path, paths))
+        else:
+            results = [self._prepare_path(path) for path in paths]
 
+        ret = OrderedDict()
+        for path, result in zip(paths, results):
+            if result is None:
+                continue
+            wrapped, chain_key, duration = result
             self._path_wrapped_map[path] = wrapped
+            self._path_chain_key_map[path] = chain_key
+            self._path_variant_map.pop(path, None)
+            ret[path] = duration
+        return ret
 
-        return
+    def _prepare_path(self, path):
+        func = self._path_func_map[path]
+        if func is None:
+            return None  # handled by run()
+
+        chain_key = self._get_chain_key(path)
+        if self._path_chain_key_map.get(path) == chain_key:
+            return None  # already compiled and nothing's changed
+
+        start_time = time.perf_counter()
+        wrapped = self._build_chain(path, self._get_used_mws(path))
+        return wrapped, chain_key, time.perf_counter() - start_time
+
+    def _get_used_mws(self, path):
+        deps = self.get_dep_names(path)
+        all_mws = self._path_mw_map[path]
+
+        # filter out unused middlewares
+        return [mw for mw in all_mws if not mw._face_optional
+                or [p for p in mw._face_provides if p in deps]]
+
+    def _build_chain(self, path, mws):
+        func = self._path_func_map[path]
+        prs = self.subprs_map[path] if path else self
+        provides = []
+        if prs.posargs.provides:
+            provides += [prs.posargs.provides]
+        if prs.post_posargs.provides:
+            provides += [prs.post_posargs.provides]
+
+        flag_names = [f.name for f in self.get_flags(path=path)]
+        provides += _BUILTIN_PROVIDES + flag_names
+
+        mws = group_providers(mws)
+        # middlewares may provide lazy() values, and flag values are
+        # Lazy when conversion is deferred. nothing else needs resolving.
+        lazy_names = set().union(*[mw._face_provides for mw in mws])
+        if self.defer_conversion:
+            lazy_names.update(flag_names)
+        try:
+            return get_middleware_chain(mws, func, provides, lazy_names=lazy_names)
+        except NameError as ne:
+            ne.args = (ne.args[0] + f' (in path: {path!r})',)
+            raise
+
+    def _get_wrapped(self, path, flags):
+        """Get the compiled chain for *path*, omitting any flag-gated
+        middlewares which are inactive for *flags*. Variants are
+        compiled on first use and cached alongside the main chain.
+        """
+        wrapped = self._path_wrapped_map[path]
+        gated = [mw for mw in self._path_mw_map[path]
+                 if getattr(mw, '_face_active', None) is not None]
+        if not gated:
+            return wrapped
+
+        inactive = tuple([mw for mw in gated if not is_middleware_active(mw, flags)])
+        if not inactive:
+            return wrapped  # all active, same as the main chain
+
+        variant_map = self._path_variant_map.setdefault(path, {})
+        try:
+            return variant_map[inactive]
+        except KeyError:
+            pass
+        variant_mws = [mw for mw in self._get_used_mws(path) if mw not in inactive]
+        ret = variant_map[inactive] = self._build_chain(path, variant_mws)
+        return ret
 
     def run(self, argv=None, extras=None, print_error=None):
         """Parses arguments and dispatches to the appropriate subcommand
@@ -404,6 +584,15 @@ class Command(Parser):
            print_error (callable): The function that formats/prints
                error messages before program exit on CLI errors.
 
+        If the handler or any middleware is an ``async def``
+        function, :meth:`run()` drives the dispatch to completion in a
+        new event loop. Use :meth:`run_async()` from code that's
+        already running in an event loop.
+
+        Files opened during parsing, such as by
+        :class:`~face.InputFileParam`, are closed once the handler
+        returns.
+
         .. note::
 
            For efficiency, :meth:`run()` only checks the subcommand
@@ -411,6 +600,28 @@ class Command(Parser):
            configured properly, call :meth:`prepare()`.
 
         """
+        with _dispatch_scope():
+            ret, awaitable = self._run(argv, extras, print_error)
+            if awaitable is not None:
+                import asyncio
+                ret = asyncio.run(awaitable)
+        return ret
+
+    async def run_async(self, argv=None, extras=None, print_error=None):
+        """The :mod:`asyncio` counterpart to :meth:`run()`, taking the
+        same arguments. Awaits async handlers and middlewares in the
+        running event loop, so they can share loop-bound resources
+        with the caller. Synchronous chains are called as usual.
+        """
+        with _dispatch_scope():
+            ret, awaitable = self._run(argv, extras, print_error)
+            if awaitable is not None:
+                ret = await awaitable
+        return ret
+
+    def _run(self, argv, extras, print_error):
+        # returns a (result, awaitable) pair, the latter is None
+        # unless the chain for the invoked subcommand is async
         if print_error is None or print_error is True:
             print_error = default_print_error
         elif print_error and not callable(print_error):
@@ -419,6 +630,15 @@ class Command(Parser):
         kwargs = dict(extras) if extras else {}
         kwargs['print_error_'] = print_error  # TODO: print_error_ in builtin provides?
 
+        prs_res = self._prescan(argv)
+        if prs_res is not None:
+            # --help and --version skip conversion, flagfiles, and middleware
+            kwargs.update(prs_res.to_cmd_scope())
+            cmd = kwargs['subcommand_']
+            if self.version_flag and prs_res.flags.get(self.version_flag.name):
+                return self._print_version(), None
+            return inject(cmd.help_handler.func, kwargs), None
+
         try:
             prs_res = self.parse(argv=argv)
         except ArgumentParseError as ape:
@@ -428,21 +648,9 @@ class Command(Parser):
             cmd = prs_res.to_cmd_scope()['subcommand_']
             if cmd.help_handler and prs_res.flags and prs_res.flags.get(cmd.help_handler.flag.name):
                 kwargs.update(prs_res.to_cmd_scope())
-                return inject(cmd.help_handler.func, kwargs)
-
-            msg = 'error: ' + (prs_res.name or self.name)
-            if prs_res.subcmds:
-                msg += ' ' + ' '.join(prs_res.subcmds or ())
+                return inject(cmd.help_handler.func, kwargs), None
 
-            # args attribute, nothing to do with cmdline args this is
-            # the standard-issue Exception
-            e_msg = ape.args[0]
-            if e_msg:
-                msg += ': ' + e_msg
-            cle = CommandLineError(msg)
-            if print_error:
-                print_error(msg)
-            raise cle
+            self._raise_cli_error(prs_res, ape, print_error)
 
         kwargs.update(prs_res.to_cmd_scope())
 
@@ -457,7 +665,9 @@ class Command(Parser):
 
         if help_flag_set:
             # Explicit --help: show help, exit 0
-            return inject(cmd.help_handler.func, kwargs)
+            return inject(cmd.help_handler.func, kwargs), None
+        elif self.version_flag and prs_res.flags.get(self.version_flag.name):
+            return self._print_version(), None  # e.g., from a flagfile
         elif not func:
             # No handler (subcommand group invoked without subcommand)
             if cmd.help_handler:
@@ -472,7 +682,7 @@ class Command(Parser):
             raise cle
 
         self.prepare(paths=[prs_res.subcmds])
-        wrapped = self._path_wrapped_map.get(prs_res.subcmds, func)
+        wrapped = self._get_wrapped(prs_res.subcmds, prs_res.flags)
 
         try:
             ret = inject(wrapped, kwargs)
@@ -480,4 +690,100 @@ class Command(Parser):
             if print_error:
                 print_error(ue.format_message())
             raise
-        return ret
+        except ArgumentParseError as ape:
+            if not self.defer_conversion:
+                raise
+            # deferred flag conversions fail when first used
+            self._raise_cli_error(prs_res, ape, print_error)
+        if is_async_callable(wrapped):
+            return None, self._await_result(prs_res, ret, print_error)
+        return ret, None
+
+    def _prescan(self, argv):
+        """Look for the help and version flags, returning a minimal
+        CommandParseResult if either is set, without converting
+        values or reading flagfiles. Returns None otherwise, including
+        for any arguments the full parse would reject."""
+        if argv is None:
+            argv = sys.argv
+        if not argv or not all([isinstance(arg, str) for arg in argv]):
+            return None
+        try:
+            subcmds, args = self._parse_subcmds(list(argv)[1:])
+        except ArgumentParseError:
+            return None
+        subcmds = tuple(subcmds)
+        cmd = self.subprs_map[subcmds] if subcmds else self
+        help_flag = getattr(getattr(cmd, 'help_handler', None), 'flag', None)
+        early_names = [f.name for f in (help_flag, self.version_flag) if f]
+        if not early_names:
+            return None
+
+        # unfiltered, as filtering requires introspecting middleware
+        flag_map = self._path_flag_map[subcmds]
+        while args:
+            arg = args[0]
+            if not arg or arg[0] != '-' or arg == '-' or arg == '--':
+                break
+            arg, eq, _ = arg.partition('=')
+            flag = flag_map.get(normalize_flag_name(arg))
+            if flag is None:
+                break
+            if callable(flag.parse_as):
+                args = args[1:] if eq else args[2:]
+                continue
+            if eq:
+                break
+            if flag.name in early_names:
+                prs_res = CommandParseResult(parser=self, argv=argv)
+                prs_res.name, prs_res.subcmds = argv[0], subcmds
+                prs_res.flags = OrderedDict([(flag.name, flag.parse_as)])
+                prs_res.posargs = ()
+                return prs_res
+            args = args[1:]
+        return None
+
+    def _get_version(self):
+        version = self.version
+        if callable(version):
+            return version()
+        if version is not True:
+            return version
+        from importlib import metadata
+        module_name = getattr(self.func, '__module__', None) or ''
+        dist_names = metadata.packages_distributions().get(module_name.partition('.')[0])
+        dist_name = dist_names[0] if dist_names else self.name
+        try:
+            return metadata.version(dist_name)
+        except metadata.PackageNotFoundError:
+            return 'unknown'
+
+    def _print_version(self):
+        echo(f'{self.name} {self._get_version()}')
+
+    async def _await_result(self, prs_res, awaitable, print_error):
+        try:
+            return await awaitable
+        except UsageError as ue:
+            if print_error:
+                print_error(ue.format_message())
+            raise
+        except ArgumentParseError as ape:
+            if not self.defer_conversion:
+                raise
+            self._raise_cli_error(prs_res, ape, print_error)
+
+    def _raise_cli_error(self, prs_res, ape, print_error):
+        msg = 'error: ' + (prs_res.name or self.name)
+        if prs_res.subcmds:
+            msg += ' ' + ' '.join(prs_res.subcmds or ())
+
+        # args attribute, nothing to do with cmdline args this is
+        # the standard-issue Exception
+        e_msg = ape.args[0]
+        if e_msg:
+            msg += ': ' + e_msg
+        cle = CommandLineError(msg)
+        if print_error:
+            print_error(msg)
+        raise cle
@@ -1,5 +1,3 @@
-from boltons.iterutils import unique
-
 import face.utils
 
 class FaceException(Exception):
@@ -34,6 +32,7 @@ class InvalidSubcommand(ArgumentParseError):
     @classmethod
     def from_parse(cls, prs, subcmd_name):
         # TODO: add edit distance calculation
+        from boltons.iterutils import unique  # deferred, imports hashlib and socket
         valid_subcmds = unique([path[:1][0] for path in prs.subprs_map.keys()])
         msg = ('unknown subcommand "%s", choose from: %s'
                % (subcmd_name, ', '.join(valid_subcmds)))
@@ -47,6 +46,7 @@ class UnknownFlag(ArgumentParseError):
     @classmethod
     def from_parse(cls, cmd_flag_map, flag_name):
         # TODO: add edit distance calculation
+        from boltons.iterutils import unique
         valid_flags = unique([face.utils.format_flag_label(flag) for flag in
                               cmd_flag_map.values() if not flag.display.hidden])
         msg = f"unknown flag \"{flag_name}\", choose from: {', '.join(valid_flags)}"
@@ -0,0 +1,583 @@
+import io
+import os
+import sys
+import queue
+import stat
+import threading
+
+# compression and mmap modules are imported on first use, as most
+# programs importing face never open a file through it.
+_ZSTD_MODULES = None
+
+
+DEFAULT_BUFFER_SIZE = 128 * 1024
+DEFAULT_WRITE_BUFFER_SIZE = 1024 * 1024
+
+_FILE_VALUE_CACHE = {}  # (abspath, encoding): ((st_dev, st_ino, st_mtime_ns, st_size), text)
+_FILE_VALUE_LOCK = threading.Lock()
+
+_MAGIC_MAP = [(b'\x1f\x8b', 'gzip'),
+              (b'BZh', 'bz2'),
+              (b'\xfd7zXZ\x00', 'xz'),
+              (b'\x28\xb5\x2f\xfd', 'zstd')]
+_MAGIC_SIZE = max([len(magic) for magic, _ in _MAGIC_MAP])
+
+
+def detect_compression(header):
+    """Returns the name of the compression format (``'gzip'``,
+    ``'bz2'``, ``'xz'``, or ``'zstd'``) indicated by the magic bytes
+    at the start of *header*, or None if it's not recognized."""
+    for magic, name in _MAGIC_MAP:
+        if header.startswith(magic):
+            return name
+    return None
+
+
+def _get_zstd_modules():
+    # (zstd, zstandard), either of which may be None
+    global _ZSTD_MODULES
+    if _ZSTD_MODULES is None:
+        zstd = zstandard = None
+        try:
+            from compression import zstd  # python 3.14+
+        except ImportError:
+            try:
+                import zstandard
+            except ImportError:
+                pass
+        _ZSTD_MODULES = (zstd, zstandard)
+    return _ZSTD_MODULES
+
+
+def is_compression_supported(name):
+    "zstd requires Python 3.14+ or the zstandard package."
+    if name == 'zstd':
+        return _get_zstd_modules() != (None, None)
+    return name in ('gzip', 'bz2', 'xz')
+
+
+def read_file_value(path, encoding='utf-8'):
+    """Read the text of the small file at *path*, caching it for the
+    life of the process. The file is only reread once its inode,
+    modification time, or size change, as when a mounted secret is
+    rotated. Text is cached separately for each *encoding*.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _FILE_VALUE_CACHE.get((path, encoding))
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(path, encoding=encoding) as f:
+        text = f.read()
+    with _FILE_VALUE_LOCK:
+        _FILE_VALUE_CACHE[path, encoding] = (key, text)
+    return text
+
+
+def clear_file_value_cache():
+    "Clear the cache used by :func:`read_file_value`."
+    with _FILE_VALUE_LOCK:
+        _FILE_VALUE_CACHE.clear()
+
+
+def _open_decompressor(stream, name):
+    if name == 'gzip':
+        import gzip
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    elif name == 'bz2':
+        import bz2
+        return bz2.BZ2File(stream, mode='rb')
+    elif name == 'xz':
+        import lzma
+        return lzma.LZMAFile(stream, mode='rb')
+    elif name == 'zstd':
+        zstd, zstandard = _get_zstd_modules()
+        if zstd is not None:
+            return zstd.ZstdFile(stream, mode='rb')
+        return zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+    raise ValueError(f'unsupported compression: {name!r}')
+
+
+class _ThreadedReader(io.RawIOBase):
+    # reads ahead from *stream* on a background thread, so that
+    # decompression overlaps with the consumer's work
+    def __init__(self, stream, chunk_size, max_chunks=4, join_on_close=True):
+        self._stream = stream
+        self._join_on_close = join_on_close
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(max_chunks)
+        self._stopped = threading.Event()
+        self._chunk = memoryview(b'')
+        self._done = False
+        self._thread = threading.Thread(target=self._read_ahead, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            return True
+        return False
+
+    def _read_ahead(self):
+        try:
+            while True:
+                chunk = self._stream.read(self._chunk_size)
+                if not self._put(chunk) or not chunk:
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if not self._chunk:
+            if self._done:
+                return 0
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                self._done = True
+                raise item
+            if not item:
+                self._done = True
+                return 0
+            self._chunk = memoryview(item)
+        size = min(len(b), len(self._chunk))
+        b[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stopped.set()
+            if self._join_on_close:
+                self._thread.join()
+                self._stream.close()
+        super().close()
+
+
+def _get_fd_kind(fd):
+    st_mode = os.fstat(fd).st_mode
+    if stat.S_ISREG(st_mode):
+        return 'file'
+    if os.isatty(fd):
+        return 'tty'
+    if stat.S_ISFIFO(st_mode) or stat.S_ISSOCK(st_mode):
+        return 'pipe'
+    return 'other'
+
+
+def _copy_stream(src, dest, buffer_size):
+    total, buf = 0, bytearray(buffer_size)
+    view = memoryview(buf)
+    while True:
+        size = src.readinto(buf)
+        if not size:
+            break
+        dest.write(view[:size])
+        total += size
+    return total
+
+
+class InputFile:
+    """The value parsed by an :class:`~face.InputFileParam` or
+    :class:`~face.StdinParam`: an open file, with lazily-created
+    views of its contents.
+
+    Attributes:
+       path (str): The path of the file, or ``'-'`` for stdin.
+       kind (str): ``'file'`` for regular files, or for stdin,
+          ``'pipe'``, ``'tty'``, or ``'other'``, e.g., when stdin has
+          been replaced by an in-memory stream.
+       size (int): The size of the file in bytes when opened, or None
+          if it's not a regular file.
+       compression (str): The detected compression format, if
+          decompression was enabled, otherwise None.
+    """
+    def __init__(self, path, fd=None, stream=None, buffer_size=DEFAULT_BUFFER_SIZE,
+                 decompress=False, threaded=False, kind='file', offset=0):
+        # *fd* is owned and closed with the InputFile. *stream*, if
+        # set, is read instead of the fd, e.g., for pipes and ttys.
+        self.path = path
+        self.kind = kind
+        self._fd = fd
+        self._stream = stream
+        self._offset = offset
+        self.size = os.fstat(fd).st_size - offset if kind == 'file' else None
+        self._buffer_size = buffer_size
+        self._threaded = threaded
+        self._mmap = None
+        self._view = None
+        self._reader = None
+        self._closed = False
+        self._peeked = False
+        self._owns_stream = False
+        self._stdin_wrapper = None
+        self.compression = None
+        if decompress:
+            self.compression = detect_compression(self._peek(_MAGIC_SIZE))
+
+    @classmethod
+    def from_stdin(cls, buffer_size=DEFAULT_BUFFER_SIZE, **kw):
+        """Create an InputFile reading from stdin, which should not have
+        been read from yet. When stdin is a regular file or a pipe, its
+        file descriptor is read directly, bypassing :data:`sys.stdin`'s
+        small buffer, and is not closed with the InputFile."""
+        stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+        try:
+            stdin_fd = stdin.fileno()
+        except (AttributeError, OSError, ValueError):
+            stdin_fd = None
+        kind = 'other' if stdin_fd is None else _get_fd_kind(stdin_fd)
+        if kind == 'file':
+            fd = os.dup(stdin_fd)
+            offset = os.lseek(fd, 0, os.SEEK_CUR)
+            return cls('-', fd, buffer_size=buffer_size, kind=kind, offset=offset, **kw)
+        if kind == 'pipe':
+            fd = os.dup(stdin_fd)
+            stream = open(fd, 'rb', buffering=buffer_size, closefd=False)
+            ret = cls('-', fd, stream=stream, buffer_size=buffer_size, kind=kind, **kw)
+            ret._owns_stream = True
+            return ret
+        wrapper = None
+        if not hasattr(stdin, 'peek'):
+            stdin = wrapper = io.BufferedReader(stdin)
+        ret = cls('-', stream=stdin, buffer_size=buffer_size, kind=kind, **kw)
+        ret._stdin_wrapper = wrapper
+        return ret
+
+    def _peek(self, size):
+        if self._stream is not None:
+            self._peeked = True
+            return self._stream.peek(size)[:size]
+        if hasattr(os, 'pread'):
+            return os.pread(self._fd, size, self._offset)
+        ret = os.read(self._fd, size)
+        os.lseek(self._fd, self._offset, os.SEEK_SET)
+        return ret
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def _check_open(self):
+        if self._closed:
+            raise ValueError(f'I/O operation on closed input file: {self.path!r}')
+
+    @property
+    def view(self):
+        """A read-only :class:`memoryview` of the whole file, backed by
+        a memory map, so data is paged in as it is accessed rather
+        than read up front. Only available for uncompressed regular
+        files, including stdin redirected from a file."""
+        if self._view is None:
+            self._check_open()
+            if self.compression:
+                raise io.UnsupportedOperation(f'{self.compression}-compressed input'
+                                              ' cannot be memory-mapped, use reader')
+            if self.kind != 'file':
+                desc = 'stdin' if self.kind == 'other' else f'{self.kind} input'
+                raise io.UnsupportedOperation(f'{desc} cannot be memory-mapped, use reader')
+            if not self.size:
+                self._view = memoryview(b'')  # empty files can't be mapped
+            else:
+                import mmap
+                self._mmap = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mmap)[self._offset:]
+        return self._view
+
+    @property
+    def reader(self):
+        """A buffered binary reader, positioned at the start of the
+        file, and decompressing if compression was detected."""
+        if self._reader is None:
+            self._check_open()
+            if self._stream is not None:
+                stream = self._stream
+            else:
+                stream = open(self._fd, 'rb', buffering=self._buffer_size, closefd=False)
+            if self.compression:
+                stream = _open_decompressor(stream, self.compression)
+            if self._threaded:
+                # don't wait on a blocked read of a pipe or tty when closing
+                stream = _ThreadedReader(stream, self._buffer_size,
+                                         join_on_close=self.kind == 'file')
+            if self.compression or self._threaded:
+                stream = io.BufferedReader(stream, self._buffer_size)
+            self._reader = stream
+        return self._reader
+
+    def iter_lines(self, keepends=True):
+        """Iterate over the lines of the input as bytes, skipping the
+        overhead of decoding text."""
+        if keepends:
+            yield from self.reader
+            return
+        for line in self.reader:
+            yield line[:-1] if line[-1:] == b'\n' else line
+
+    def iter_records(self, sep=b'\0'):
+        """Iterate over the input's records as bytes, split on *sep*,
+        e.g., the output of ``find -print0``."""
+        read, rest = self.reader.read, b''
+        while True:
+            chunk = read(self._buffer_size)
+            if not chunk:
+                break
+            records = (rest + chunk).split(sep)
+            rest = records.pop()
+            yield from records
+        if rest:
+            yield rest
+
+    def iter_chunks(self, size=None):
+        """Iterate over the input in bytes-like chunks of *size* bytes,
+        defaulting to the buffer size. Uncompressed regular files are
+        chunked without copying, as slices of :attr:`view`."""
+        size = size or self._buffer_size
+        if self.kind == 'file' and not self.compression:
+            view = self.view
+            for i in range(0, len(view), size):
+                yield view[i:i + size]
+            return
+        read = self.reader.read
+        while chunk := read(size):
+            yield chunk
+
+    def copy_to(self, dest):
+        """Copy the rest of the input to *dest*, a binary file or an
+        :class:`OutputFile`, returning the number of bytes copied.
+
+        Where supported, uncompressed input is passed through in the
+        kernel, with :func:`os.sendfile` for regular files and
+        :func:`os.splice` for pipes, rather than read into Python.
+        """
+        self._check_open()
+        if isinstance(dest, OutputFile):
+            dest = dest.writer
+        try:
+            out_fd = dest.fileno()
+        except (AttributeError, OSError, ValueError):
+            out_fd = None
+        if out_fd is not None and not self.compression and not self._threaded:
+            dest.flush()
+            if self.kind == 'file' and self._reader is None and hasattr(os, 'sendfile'):
+                copied = self._sendfile(out_fd)
+                if copied is not None:
+                    return copied
+            elif self.kind == 'pipe' and hasattr(os, 'splice'):
+                return self._splice(out_fd, dest)
+        return _copy_stream(self.reader, dest, self._buffer_size)
+
+    def _sendfile(self, out_fd):
+        offset = start = os.lseek(self._fd, 0, os.SEEK_CUR)
+        while True:
+            try:
+                sent = os.sendfile(out_fd, self._fd, offset, 1 << 30)
+            except OSError:
+                if offset == start:
+                    return None  # unsupported destination, fall back
+                raise
+            if not sent:
+                break
+            offset += sent
+        os.lseek(self._fd, offset, os.SEEK_SET)
+        return offset - start
+
+    def _splice(self, out_fd, dest):
+        total = 0
+        if self._peeked or self._reader is not None:
+            # write out what's already buffered, from detecting
+            # compression or from earlier reads through the reader
+            buffered = self._stream.read1(self._buffer_size)
+            dest.write(buffered)
+            dest.flush()
+            total += len(buffered)
+        while True:
+            try:
+                spliced = os.splice(self._fd, out_fd, 1 << 20)
+            except OSError:
+                # e.g., the destination was opened for appending
+                return total + _copy_stream(self._stream, dest, self._buffer_size)
+            if not spliced:
+                break
+            total += spliced
+        return total
+
+    def __fspath__(self):
+        return self.path
+
+    def close(self):
+        "Close the file and release any views. Safe to call repeatedly."
+        if self._closed:
+            return
+        self._closed = True
+        if self._reader is not None and self._reader is not self._stream:
+            self._reader.close()
+        try:
+            if self._view is not None:
+                self._view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            pass  # a slice of the view outlived the dispatch, let gc have the map
+        if self._owns_stream:
+            self._stream.close()
+        if self._fd is not None:
+            os.close(self._fd)
+        if self._stdin_wrapper is not None:
+            self._stdin_wrapper.detach()  # leave stdin open
+        self._fd = self._stream = self._mmap = self._view = self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        from boltons.funcutils import format_nonexp_repr  # deferred, imports inspect
+        return format_nonexp_repr(self, ['path', 'kind', 'size'], ['compression', 'closed'])
+
+
+class OutputFile:
+    """The value parsed by an :class:`~face.OutputFileParam`. Writes go
+    to a temporary file in the destination directory, which replaces
+    the destination atomically on :meth:`commit`, so that readers
+    never see a partially-written file.
+
+    The temporary file is created once the :attr:`writer` is first
+    used, or on :meth:`commit`, so a successful run which writes
+    nothing still leaves an empty file, not a stale one.
+
+    Attributes:
+       path (str): The destination path, or ``'-'`` for stdout.
+    """
+    def __init__(self, path, buffer_size=DEFAULT_WRITE_BUFFER_SIZE, fsync=False):
+        self.path = path
+        self._buffer_size = buffer_size
+        self._fsync = fsync
+        self._writer = None
+        self._part_path = None
+        self._closed = False
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def is_stdout(self):
+        return self.path == '-'
+
+    def _open_part_file(self):
+        dest_dir, basename = os.path.split(os.path.abspath(self.path))
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+        for _ in range(100):
+            part_path = os.path.join(dest_dir, f'.{basename}.{os.urandom(4).hex()}.part')
+            try:
+                fd = os.open(part_path, flags, 0o666)  # respects the umask
+            except FileExistsError:
+                continue
+            break
+        else:
+            raise FileExistsError(f'could not create a part file for: {self.path!r}')
+        try:
+            # keep the permissions of the file being replaced
+            os.chmod(part_path, stat.S_IMODE(os.stat(self.path).st_mode))
+        except OSError:
+            pass
+        self._part_path = part_path
+        return open(fd, 'wb', buffering=self._buffer_size)
+
+    @property
+    def writer(self):
+        "A buffered binary writer."
+        if self._writer is None:
+            if self._closed:
+                raise ValueError(f'I/O operation on closed output file: {self.path!r}')
+            if self.is_stdout:
+                sys.stdout.flush()
+                self._writer = getattr(sys.stdout, 'buffer', sys.stdout)
+            else:
+                self._writer = self._open_part_file()
+        return self._writer
+
+    def write(self, data):
+        "Write bytes to the :attr:`writer`."
+        return self.writer.write(data)
+
+    def __fspath__(self):
+        return self.path
+
+    def commit(self):
+        """Flush, optionally fsync, and move the written file into place.
+        If nothing was written, the destination is replaced with an
+        empty file."""
+        if self._closed:
+            return
+        if self._writer is None and not self.is_stdout:
+            self._writer = self._open_part_file()
+        self._closed = True
+        writer, self._writer = self._writer, None
+        if writer is None:
+            return  # stdout, never written to
+        if self.is_stdout:
+            writer.flush()
+            return
+        try:
+            writer.flush()
+            if self._fsync:
+                os.fsync(writer.fileno())
+            writer.close()
+            os.replace(self._part_path, self.path)
+        except BaseException:
+            self._remove_part_file(writer)
+            raise
+        if self._fsync and hasattr(os, 'O_DIRECTORY'):
+            # make the rename itself durable
+            dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        return
+
+    def discard(self):
+        "Close and remove the temporary file, leaving the destination as-is."
+        if self._closed:
+            return
+        self._closed = True
+        writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        if self.is_stdout:
+            writer.flush()  # already partly out the door
+            return
+        self._remove_part_file(writer)
+
+    def _remove_part_file(self, writer):
+        try:
+            writer.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self._part_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+    def __repr__(self):
+        from boltons.funcutils import format_nonexp_repr
+        return format_nonexp_repr(self, ['path'], ['closed'])
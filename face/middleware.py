@@ -145,10 +145,23 @@ broad usefulness, consider contributing it back to the core!
 """
 
 
+import time
+import inspect
+import threading
+import contextvars
+from functools import partial
+from collections import OrderedDict
+from typing import Callable, List, Optional, Union
+
+from boltons.iterutils import unique
+from boltons.funcutils import FunctionBuilder
+from boltons.typeutils import make_sentinel
+
 from face.parser import Flag
-from face.sinter import make_chain, get_arg_names, get_fb, get_callable_labels
+from face.utils import flag_to_identifier
+from face.sinter import make_chain, get_arg_names, get_fb, get_callable_labels, is_async_callable
 from face.sinter import inject  # transitive import for external use
-from typing import Callable, List, Optional, Union
+from face.sinter import Lazy, resolve_lazy
 
 INNER_NAME = 'next_'
 
@@ -176,7 +189,8 @@ def face_middleware(func: Optional[Callable] = None,
                    *,
                    provides: Union[List[str], str] = [],
                    flags: List[Flag] = [],
-                   optional: bool = False) -> Callable:
+                   optional: bool = False,
+                   active: Optional[Union[str, Callable]] = None) -> Callable:
     """A decorator to mark a function as face middleware, which wraps
     execution of a subcommand handler function. This decorator can be
     called with or without arguments:
@@ -188,6 +202,12 @@ def face_middleware(func: Optional[Callable] = None,
            automatically added to any Command which adds this middleware.
         optional: Whether this middleware should be skipped if its 
            provides are not required by the command.
+        active: An optional activation predicate, either the name of
+           a flag, or a callable which takes the parsed flags dict
+           and returns whether this middleware should run. Inactive
+           middlewares are compiled out of the chain entirely, costing
+           nothing at call time. Middlewares with an activation
+           predicate may not have provides.
 
     The first argument of the decorated function must be named
     ``next_``. This argument is a function, representing the next
@@ -199,6 +219,15 @@ def face_middleware(func: Optional[Callable] = None,
     """
     if isinstance(provides, str):
         provides = [provides]
+    if active is not None:
+        if provides:
+            raise TypeError('middlewares with an activation predicate cannot'
+                            ' have provides, as downstream functions would not'
+                            ' always receive them: %r' % (provides,))
+        if isinstance(active, str):
+            active = _make_flag_predicate(active)
+        elif not callable(active):
+            raise TypeError(f'expected flag name or callable for active, not: {active!r}')
     flags = list(flags)
     if flags:
         for flag in flags:
@@ -211,6 +240,7 @@ def face_middleware(func: Optional[Callable] = None,
         func._face_flags = list(flags)
         func._face_provides = list(provides)
         func._face_optional = optional
+        func._face_active = active
         return func
 
     if func and callable(func):
@@ -219,7 +249,555 @@ def face_middleware(func: Optional[Callable] = None,
     return decorate_face_middleware
 
 
-def get_middleware_chain(middlewares, innermost, preprovided):
+def lazy(func: Callable) -> Lazy:
+    """Wrap a zero-argument callable, such as an expensive client
+    constructor, so that middleware can provide its result without
+    computing it up front::
+
+      @face_middleware(provides=['client'])
+      def client_mw(next_, api_url):
+          return next_(client=lazy(lambda: make_client(api_url)))
+
+    The value is computed the first time it's passed to a downstream
+    middleware or handler which accepts it, then cached for the rest
+    of the invocation. Subcommands which don't accept it never pay
+    for it.
+    """
+    return Lazy(func)
+
+
+def face_provider(func: Optional[Callable] = None,
+                  *,
+                  provides: Optional[str] = None,
+                  flags: List[Flag] = [],
+                  optional: bool = False) -> Callable:
+    """A decorator to mark a function as a face provider, a simpler
+    kind of middleware which doesn't wrap execution, it only computes
+    a single value for downstream injection. Like
+    :func:`face_middleware`, this decorator can be called with or
+    without arguments.
+
+    Args:
+        provides: The name of the provided value. Defaults to the
+           name of the decorated function.
+        flags: An optional list of Flag instances, which will be
+           automatically added to any Command which adds this provider.
+        optional: Whether this provider should be skipped if its
+           value is not required by the command.
+
+    Unlike middlewares, the decorated function does not take
+    ``next_``, it takes only the injectables it needs and returns the
+    provided value. Because providers have no wrap-around logic,
+    consecutive providers in a middleware stack are resolved as a
+    dependency graph, with independent providers running
+    concurrently on a thread pool (or as concurrent tasks, if any of
+    them are async).
+    """
+    flags = list(flags)
+    for flag in flags:
+        if not isinstance(flag, Flag):
+            raise TypeError(f'expected Flag object, not: {flag!r}')
+
+    def decorate_face_provider(func):
+        name = provides or get_fb(func).name
+        if not isinstance(name, str):
+            raise TypeError(f'expected provider name as a string, not: {name!r}')
+        func._face_provider = True
+        check_middleware(func, provides=[name])
+        func.is_face_middleware = True
+        func._face_flags = list(flags)
+        func._face_provides = [name]
+        func._face_optional = optional
+        func._face_active = None
+        return func
+
+    if func and callable(func):
+        return decorate_face_provider(func)
+
+    return decorate_face_provider
+
+
+_UNSET = make_sentinel('_UNSET')  # placeholder default for weak provider dependencies
+
+_PROVIDER_EXECUTOR = None
+_PROVIDER_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_provider_executor():
+    # shared across invocations, so that running providers
+    # concurrently doesn't cost a thread pool startup per run
+    global _PROVIDER_EXECUTOR
+    if _PROVIDER_EXECUTOR is None:
+        with _PROVIDER_EXECUTOR_LOCK:
+            if _PROVIDER_EXECUTOR is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _PROVIDER_EXECUTOR = ThreadPoolExecutor(thread_name_prefix='face-provider')
+    return _PROVIDER_EXECUTOR
+
+
+class ProviderGroup:
+    """Mostly for internal use, a ProviderGroup is a middleware built by
+    :func:`group_providers` out of consecutive :func:`face_provider`
+    functions. It resolves its providers in dependency order, running
+    each wave of mutually-independent providers concurrently, then
+    calls ``next_`` with all the provided values.
+    """
+    is_face_middleware = True
+
+    def __init__(self, providers):
+        self.providers = list(providers)
+        self._face_provides = [p._face_provides[0] for p in self.providers]
+        self._face_flags = []
+        self._face_optional = False
+        self._face_active = None
+        self.waves = self._get_waves()
+
+        provided = set(self._face_provides)
+        required, defaulted = [], []
+        for provider in self.providers:
+            fb = get_fb(provider)
+            defaults = fb.get_defaults_dict()
+            for arg in fb.get_arg_names():
+                if arg in provided:
+                    continue
+                if arg in defaults:
+                    defaulted.append(arg)
+                else:
+                    required.append(arg)
+        required = unique(required)
+        defaulted = [a for a in unique(defaulted) if a not in required]
+        # weak dependencies stay weak; unset args are left for each
+        # provider's own defaults to fill in
+        self._sinter_fb = FunctionBuilder(name='provider_group',
+                                          args=[INNER_NAME] + required + defaulted,
+                                          defaults=(_UNSET,) * len(defaulted))
+
+    def _get_waves(self):
+        name_map = {p._face_provides[0]: p for p in self.providers}
+        deps = {p: set(get_arg_names(p)) & set(name_map) for p in self.providers}
+        waves, done = [], set()
+        while len(done) < len(self.providers):
+            wave = [p for p in self.providers
+                    if p not in done and all([name_map[d] in done for d in deps[p]])]
+            if not wave:
+                pending = sorted([p._face_provides[0] for p in self.providers if p not in done])
+                raise NameError(f'dependency cycle between providers: {pending!r}')
+            waves.append(wave)
+            done.update(wave)
+        return waves
+
+    def _get_kwargs(self, kwargs):
+        return {k: v for k, v in kwargs.items() if v is not _UNSET}
+
+    @staticmethod
+    def _inject(provider, kwargs):
+        # providers are called here rather than by the generated chain,
+        # so Lazy values the provider accepts are resolved here, too
+        arg_names = get_arg_names(provider)
+        return inject(provider, {k: resolve_lazy(v) if k in arg_names else v
+                                 for k, v in kwargs.items()})
+
+    def __call__(self, next_, **kwargs):
+        kwargs = self._get_kwargs(kwargs)
+        results = {}
+        for wave in self.waves:
+            if len(wave) == 1:
+                provider = wave[0]
+                results[provider._face_provides[0]] = self._inject(provider, dict(kwargs, **results))
+                continue
+            wave_kwargs = dict(kwargs, **results)
+            executor = _get_provider_executor()
+            futures = [executor.submit(contextvars.copy_context().run, self._inject, p, wave_kwargs)
+                       for p in wave]
+            for future in futures:
+                future.exception()  # let the whole wave finish, even if one fails
+            for provider, future in zip(wave, futures):
+                results[provider._face_provides[0]] = future.result()
+        return next_(**results)
+
+    def __repr__(self):
+        cn = self.__class__.__name__
+        return f'<{cn} provides={self._face_provides!r}>'
+
+
+class AsyncProviderGroup(ProviderGroup):
+    """The ProviderGroup used when any of the providers are async. Each
+    wave runs as concurrent tasks, with sync providers run in the
+    event loop's default executor.
+    """
+    async def __call__(self, next_, **kwargs):
+        kwargs = self._get_kwargs(kwargs)
+        import asyncio
+        results = {}
+        loop = asyncio.get_running_loop()
+        for wave in self.waves:
+            wave_kwargs = dict(kwargs, **results)
+            aws = []
+            for provider in wave:
+                if is_async_callable(provider):
+                    aws.append(self._inject(provider, wave_kwargs))
+                else:
+                    aws.append(loop.run_in_executor(None, self._inject, provider, wave_kwargs))
+            values = await asyncio.gather(*aws)
+            for provider, value in zip(wave, values):
+                results[provider._face_provides[0]] = value
+        return await next_(**results)
+
+
+def _close_resource(resource):
+    close = getattr(resource, 'close', None)
+    if callable(close):
+        close()
+
+
+class ResourcePool:
+    """A thread-safe pool of resources, created on demand by calling
+    *factory* with no arguments, and reused across acquisitions.
+
+    Args:
+       factory (callable): Creates a new resource.
+       close (callable): Tears down a resource. Defaults to calling the
+          resource's ``close()`` method, if it has one.
+       max_size (int): The most resources which may exist at once.
+          :meth:`acquire()` blocks when all of them are in use.
+          Defaults to 1.
+       idle_timeout (float): Seconds after which an unused resource
+          is closed and evicted from the pool. Defaults to ``None``,
+          meaning resources are kept until :meth:`close()`.
+    """
+    def __init__(self, factory, close=None, max_size=1, idle_timeout=None):
+        if not callable(factory):
+            raise TypeError(f'expected callable resource factory, not: {factory!r}')
+        if max_size < 1:
+            raise ValueError(f'expected max_size >= 1, not: {max_size!r}')
+        self.factory = factory
+        self.close_func = close or _close_resource
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+
+        self._cond = threading.Condition()
+        self._idle = []  # (resource, release_time) pairs, most recent last
+        self._in_use = set()  # ids of checked-out resources
+        self._retired = set()  # ids of checked-out resources to close on release
+        self._size = 0
+
+    def _pop_expired(self):
+        # call with lock held, returns resources to close
+        if self.idle_timeout is None or not self._idle:
+            return []
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [res for res, released in self._idle if released < cutoff]
+        if expired:
+            self._idle = [pair for pair in self._idle if pair[1] >= cutoff]
+            self._size -= len(expired)
+            self._cond.notify(len(expired))
+        return expired
+
+    def acquire(self, blocking=True):
+        """Get an idle resource, or create a new one if the pool is not
+        full. Blocks until a resource is released otherwise, unless
+        *blocking* is False, in which case None is returned."""
+        with self._cond:
+            expired = self._pop_expired()
+            while not self._idle and self._size >= self.max_size:
+                if not blocking:
+                    break
+                self._cond.wait()
+            if self._idle:
+                resource = self._idle.pop()[0]
+                reserved = False
+            elif self._size < self.max_size:
+                resource = None
+                reserved = True
+                self._size += 1  # reserve a slot for the new resource
+            else:
+                resource, reserved = None, False  # full, and not blocking
+        for res in expired:
+            self.close_func(res)
+        if reserved:
+            try:
+                resource = self.factory()
+            except BaseException:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        elif resource is None:
+            return None
+        with self._cond:
+            self._in_use.add(id(resource))
+        return resource
+
+    def release(self, resource):
+        """Return a resource acquired with :meth:`acquire()` to the pool."""
+        with self._cond:
+            self._in_use.discard(id(resource))
+            if id(resource) in self._retired:
+                self._retired.discard(id(resource))
+                self._size -= 1
+                to_close = [resource]
+            else:
+                self._idle.append((resource, time.monotonic()))
+                to_close = self._pop_expired()
+            self._cond.notify()
+        for res in to_close:
+            self.close_func(res)
+
+    def close(self):
+        """Close all idle resources. Resources currently in use are
+        closed when they are released. The pool remains usable, and
+        creates fresh resources as needed."""
+        with self._cond:
+            to_close = [res for res, _ in self._idle]
+            self._idle = []
+            self._retired.update(self._in_use)
+            self._size = len(self._in_use)
+            self._cond.notify_all()
+        for res in to_close:
+            self.close_func(res)
+
+    def __repr__(self):
+        cn = self.__class__.__name__
+        return f'<{cn} factory={self.factory!r} size={self._size!r} max_size={self.max_size!r}>'
+
+
+def _release_acquired(pool, future):
+    if not future.cancelled() and future.exception() is None:
+        pool.release(future.result())
+
+
+def _make_hashable(value):
+    # factory arguments, e.g., from ListParam or multi flags, as a pool key
+    if isinstance(value, (list, tuple)):
+        return tuple([_make_hashable(v) for v in value])
+    if isinstance(value, dict):
+        return frozenset([(k, _make_hashable(v)) for k, v in value.items()])
+    if isinstance(value, (set, frozenset)):
+        return frozenset([_make_hashable(v) for v in value])
+    try:
+        hash(value)
+    except TypeError:
+        return (type(value).__name__, repr(value))
+    return value
+
+
+class ResourceMiddleware:
+    """Middleware created by :func:`face_resource`, which provides a
+    pooled resource that outlives individual invocations. Resources
+    are pooled separately for each distinct set of factory
+    arguments, keeping up to *max_pools* such pools, and closing the
+    least-recently used beyond that. See :func:`face_resource` for
+    details.
+    """
+    is_face_middleware = True
+
+    def __init__(self, factory, provides, close=None, max_size=1,
+                 idle_timeout=None, flags=(), max_pools=8):
+        if max_pools < 1:
+            raise ValueError(f'expected max_pools >= 1, not: {max_pools!r}')
+        self.factory = factory
+        self.close_func = close
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_pools = max_pools
+        self._face_provides = [provides]
+        self._face_flags = list(flags)
+        self._face_optional = False
+        self._face_active = None
+
+        self._pools = OrderedDict()  # least-recently used first
+        self._pools_lock = threading.Lock()
+
+        fb = get_fb(factory)
+        if INNER_NAME in fb.args:
+            raise TypeError('resource factory %r must not take argument "%s"'
+                            % (fb.name, INNER_NAME))
+        defaults = fb.get_defaults_dict()
+        required = [a for a in fb.get_arg_names() if a not in defaults]
+        defaulted = [a for a in fb.get_arg_names() if a in defaults]
+        self._sinter_fb = FunctionBuilder(name=fb.name,
+                                          module=fb.module,
+                                          args=[INNER_NAME] + required + defaulted,
+                                          defaults=(_UNSET,) * len(defaulted))
+
+    def get_pool(self, **kwargs):
+        """Get the :class:`ResourcePool` for the factory arguments
+        *kwargs*, creating it if necessary."""
+        key = frozenset([(k, _make_hashable(v)) for k, v in kwargs.items()])
+        evicted = []
+        with self._pools_lock:
+            try:
+                self._pools.move_to_end(key)
+                return self._pools[key]
+            except KeyError:
+                pass
+            factory = partial(inject, self.factory, kwargs)
+            pool = self._pools[key] = ResourcePool(factory,
+                                                   close=self.close_func,
+                                                   max_size=self.max_size,
+                                                   idle_timeout=self.idle_timeout)
+            while len(self._pools) > self.max_pools:
+                evicted.append(self._pools.popitem(last=False)[1])
+        for old_pool in evicted:
+            old_pool.close()  # in-use resources are closed on release
+        return pool
+
+    def __call__(self, next_, **kwargs):
+        pool = self.get_pool(**{k: v for k, v in kwargs.items() if v is not _UNSET})
+        if is_async_callable(next_):
+            return self._call_async(next_, pool)
+        resource = pool.acquire()
+        try:
+            ret = next_(**{self._face_provides[0]: resource})
+        except BaseException:
+            pool.release(resource)
+            raise
+        if inspect.isawaitable(ret):
+            return self._release_after(ret, pool, resource)
+        pool.release(resource)
+        return ret
+
+    async def _release_after(self, awaitable, pool, resource):
+        try:
+            return await awaitable
+        finally:
+            pool.release(resource)
+
+    async def _call_async(self, next_, pool):
+        # in async chains, waiting for a resource held by another task
+        # happens on a worker thread, so the event loop can keep
+        # running that task until it releases the resource
+        resource = pool.acquire(blocking=False)
+        if resource is None:
+            import asyncio
+            acquiring = asyncio.get_running_loop().run_in_executor(None, pool.acquire)
+            try:
+                resource = await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                # the acquire completes on its thread regardless
+                acquiring.add_done_callback(partial(_release_acquired, pool))
+                raise
+        try:
+            return await next_(**{self._face_provides[0]: resource})
+        finally:
+            pool.release(resource)
+
+    def close(self):
+        """Close all pooled resources. Called by :meth:`Command.close()`."""
+        with self._pools_lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
+
+    def __repr__(self):
+        cn = self.__class__.__name__
+        return f'<{cn} provides={self._face_provides[0]!r} factory={self.factory!r}>'
+
+
+def face_resource(factory: Optional[Callable] = None,
+                  *,
+                  provides: Optional[str] = None,
+                  close: Optional[Callable] = None,
+                  max_size: int = 1,
+                  idle_timeout: Optional[float] = None,
+                  flags: List[Flag] = [],
+                  max_pools: int = 8) -> Callable:
+    """A decorator which turns a resource factory, like a function
+    opening a database connection, into middleware providing that
+    resource. Unlike resources set up in normal middleware, the
+    resource outlives the invocation: it's created once, and handed to
+    every subsequent :meth:`Command.run()` in the same process. Like
+    :func:`face_middleware`, this decorator can be called with or
+    without arguments.
+
+    Args:
+        provides: The name of the provided resource. Defaults to the
+           name of the factory function.
+        close: A function to tear down a resource. Defaults to calling
+           the resource's ``close()`` method, if it has one.
+        max_size: The maximum number of resources in the pool, for
+           concurrent invocations. Defaults to 1.
+        idle_timeout: Seconds after which an unused resource is closed
+           and evicted. Defaults to ``None``, never.
+        flags: An optional list of Flag instances, which will be
+           automatically added to any Command which adds this
+           middleware.
+        max_pools: The maximum number of pools, one per distinct
+           combination of factory arguments, kept at once. The
+           least-recently used pool is closed beyond that. Defaults
+           to 8.
+
+    The factory takes injectables like any other face function, and
+    resources are pooled separately per distinct combination of
+    argument values. Call :meth:`Command.close()`, or use the Command
+    as a context manager, to deterministically close all resources.
+    """
+    flags = list(flags)
+    for flag in flags:
+        if not isinstance(flag, Flag):
+            raise TypeError(f'expected Flag object, not: {flag!r}')
+
+    def decorate_face_resource(factory):
+        if not callable(factory):
+            raise TypeError(f'expected callable resource factory, not: {factory!r}')
+        name = provides or get_fb(factory).name
+        conflict_args = list(set(_BUILTIN_PROVIDES) & {name})
+        if conflict_args:
+            raise TypeError('resource %r conflicts with reserved face builtins: %r'
+                            % (name, conflict_args))
+        return ResourceMiddleware(factory, name, close=close, max_size=max_size,
+                                  idle_timeout=idle_timeout, flags=flags,
+                                  max_pools=max_pools)
+
+    if factory and callable(factory):
+        return decorate_face_resource(factory)
+
+    return decorate_face_resource
+
+
+def group_providers(middlewares):
+    """Collapse each run of consecutive :func:`face_provider` functions
+    in *middlewares* into a single :class:`ProviderGroup`
+    middleware. Other middlewares are returned as-is.
+    """
+    ret, cur_group = [], []
+    for mw in list(middlewares) + [None]:
+        if mw is not None and getattr(mw, '_face_provider', False):
+            cur_group.append(mw)
+            continue
+        if cur_group:
+            if any([is_async_callable(p) for p in cur_group]):
+                ret.append(AsyncProviderGroup(cur_group))
+            else:
+                ret.append(ProviderGroup(cur_group))
+            cur_group = []
+        if mw is not None:
+            ret.append(mw)
+    return ret
+
+
+def _make_flag_predicate(flag_name):
+    flag_name = flag_to_identifier(flag_name)
+
+    def is_flag_set(flags):
+        return bool(flags.get(flag_name))
+
+    is_flag_set.flag_name = flag_name
+    return is_flag_set
+
+
+def is_middleware_active(mw, flags):
+    """Returns True if middleware *mw* should be part of the chain for
+    an invocation with the parsed *flags* mapping. Middlewares without
+    an activation predicate are always active.
+    """
+    active = getattr(mw, '_face_active', None)
+    if active is None:
+        return True
+    return bool(active(flags or {}))
+
+
+def get_middleware_chain(middlewares, innermost, preprovided, lazy_names=()):
     """Perform basic validation of innermost function, wrap it in
     middlewares, and raise a :exc:`NameError` on any unresolved
     arguments.
@@ -231,6 +809,9 @@ def get_middleware_chain(middlewares, innermost, preprovided):
           middlewares.
        preprovided (list): A list of built-in or otherwise preprovided
           injectables.
+       lazy_names (set): Names of injectables which may be passed as
+          a :class:`Lazy`, and so must be resolved before being passed
+          on to a function which accepts them.
 
     Returns:
        A single function representing the whole middleware chain.
@@ -246,7 +827,8 @@ def get_middleware_chain(middlewares, innermost, preprovided):
     mw_builtins = set(preprovided) - {INNER_NAME}
     mw_provides = [list(mw._face_provides) for mw in middlewares]
 
-    mw_chain, mw_chain_args, mw_unres = make_chain(middlewares, mw_provides, innermost, mw_builtins, INNER_NAME)
+    mw_chain, mw_chain_args, mw_unres = make_chain(middlewares, mw_provides, innermost, mw_builtins,
+                                                  INNER_NAME, lazy_names=lazy_names)
 
     if mw_unres:
         msg = f"unresolved middleware or handler arguments: {sorted(mw_unres)!r}"
@@ -270,11 +852,16 @@ def check_middleware(func, provides=None):
     # TODO: this currently gives __main__abc instead of __main__.abc
     func_label = ''.join(get_callable_labels(func))
     arg_names = fb.args
-    if not arg_names:
+    if getattr(func, '_face_provider', False):
+        if INNER_NAME in arg_names:
+            raise TypeError('provider function %r must not take argument "%s",'
+                            ' providers return their value instead'
+                            % (func_label, INNER_NAME))
+    elif not arg_names:
         raise TypeError('middleware function %r must take at least one'
                         ' argument "%s" as its first parameter'
                         % (func_label, INNER_NAME))
-    if arg_names[0] != INNER_NAME:
+    elif arg_names[0] != INNER_NAME:
         raise TypeError('middleware function %r must take argument'
                         ' "%s" as the first parameter, not "%s"'
                         % (func_label, INNER_NAME, arg_names[0]))
@@ -1,19 +1,30 @@
+import os
 import sys
+import copy
 import shlex
 import os.path
+import threading
+import contextlib
+import contextvars
+from functools import partial
 from collections import OrderedDict
+from collections.abc import ItemsView, ValuesView
 from typing import Optional
 
-from boltons.iterutils import split, unique
+from boltons.cacheutils import LRU
 from boltons.dictutils import OrderedMultiDict as OMD
-from boltons.funcutils import format_exp_repr, format_nonexp_repr
+from boltons.typeutils import make_sentinel
 
 from face.utils import (ERROR,
                         get_type_desc,
                         flag_to_identifier,
                         normalize_flag_name,
                         process_command_name,
-                        get_minimal_executable)
+                        get_minimal_executable,
+                        iter_glob,
+                        _split_glob,
+                        Lazy,
+                        resolve_lazy)
 from face.errors import (FaceException,
                          ArgumentParseError,
                          ArgumentArityError,
@@ -23,6 +34,164 @@ from face.errors import (FaceException,
                          InvalidFlagArgument,
                          InvalidPositionalArgument,
                          MissingRequiredFlags)
+from face.files import (InputFile,
+                        OutputFile,
+                        DEFAULT_BUFFER_SIZE,
+                        DEFAULT_WRITE_BUFFER_SIZE,
+                        is_compression_supported,
+                        read_file_value)
+
+
+# boltons.funcutils imports inspect, so the repr helpers are imported
+# on first use, keeping it off the import path of parse-only programs.
+def format_exp_repr(*a, **kw):
+    from boltons.funcutils import format_exp_repr
+    return format_exp_repr(*a, **kw)
+
+
+def format_nonexp_repr(*a, **kw):
+    from boltons.funcutils import format_nonexp_repr
+    return format_nonexp_repr(*a, **kw)
+
+
+_IO_EXECUTOR = None
+_IO_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_io_executor():
+    global _IO_EXECUTOR
+    if _IO_EXECUTOR is None:
+        with _IO_EXECUTOR_LOCK:
+            if _IO_EXECUTOR is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _IO_EXECUTOR = ThreadPoolExecutor(thread_name_prefix='face-parse')
+    return _IO_EXECUTOR
+
+
+def is_io_bound(parse_as):
+    """Converters set ``io_bound = True`` to declare that they mostly
+    wait on I/O, e.g., checking a path, so face can run them
+    concurrently."""
+    return bool(getattr(parse_as, 'io_bound', False))
+
+
+_UNSET = make_sentinel('_UNSET')
+
+# always the same output for the same input, see is_pure()
+_PURE_CONVERTERS = (str, int, float, complex, bool)
+
+
+def is_pure(parse_as):
+    """Converters set ``pure = True`` to declare that their output
+    depends only on their input text, with no side effects, so face
+    can reuse parse results. See the *parse_cache_size* argument to
+    :class:`Parser`. Builtin types and non-callable values are
+    always pure."""
+    if not callable(parse_as) or parse_as in _PURE_CONVERTERS:
+        return True
+    return bool(getattr(parse_as, 'pure', False))
+
+
+def _get_flagfile_state(paths):
+    # relative flagfile paths depend on the working directory, and
+    # flagfile contents can change between parses
+    if not paths:
+        return ()
+    ret = [os.getcwd()]
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except (OSError, TypeError, ValueError):
+            ret.append((path, None))
+            continue
+        ret.append((path, stat.st_ino, stat.st_size, stat.st_mtime_ns))
+    return tuple(ret)
+
+
+def _call_all(calls):
+    # calls each (func, arg) pair, concurrently if there's more than one,
+    # returning (value, exception) pairs in order
+    def _call(func, arg):
+        try:
+            return func(arg), None
+        except Exception as e:
+            return None, e
+    if len(calls) <= 1:
+        return [_call(func, arg) for func, arg in calls]
+    executor = _get_io_executor()
+    # copied contexts keep the dispatch scope, see _add_dispatch_resource
+    futures = [executor.submit(contextvars.copy_context().run, _call, func, arg)
+               for func, arg in calls]
+    return [f.result() for f in futures]
+
+
+def _combine_errors(errors):
+    if len(errors) == 1:
+        return errors[0]
+    msg = f'{len(errors)} arguments failed to parse:\n'
+    msg += '\n'.join(['  ' + err.args[0] for err in errors])
+    return type(errors[0])(msg)
+
+
+# batch conversion for builtin types, where map() beats a python loop
+_BUILTIN_PARSE_MANY_MAP = {t: (lambda texts, _t=t: list(map(_t, texts)))
+                           for t in (str, int, float)}
+
+
+def get_parse_many(parse_as):
+    """Returns a function which converts a whole list of strings at
+    once for *parse_as*, or None if it doesn't support batch
+    conversion.
+
+    Converters opt in with a ``parse_many`` method, which takes a
+    list of strings and returns a list of values. On failure, the
+    exception raised can set an ``index`` attribute to identify the
+    bad element. Otherwise, face converts each element individually
+    to find it.
+    """
+    try:
+        return _BUILTIN_PARSE_MANY_MAP.get(parse_as) or getattr(parse_as, 'parse_many', None)
+    except TypeError:
+        return getattr(parse_as, 'parse_many', None)  # unhashable
+
+
+def _parse_many(parse_many, texts):
+    # returns (values, None) or (None, (index, exception)), where
+    # index is None if the batch converter didn't say which failed
+    try:
+        return parse_many(texts), None
+    except Exception as exc:
+        return None, (getattr(exc, 'index', None), exc)
+
+
+class _PendingValue:
+    # stands in for the value of a flag with an io_bound converter
+    # until all are converted together, see Parser._resolve_pending()
+    __slots__ = ('flag', 'arg_text')
+
+    def __init__(self, flag, arg_text):
+        self.flag = flag
+        self.arg_text = arg_text
+
+
+class _DeferredConversion:
+    # the func of the Lazy standing in for a flag's value when
+    # defer_conversion is enabled. keeps the argument text around for
+    # error messages raised before conversion, see _multi_error()
+    __slots__ = ('convert', 'arg_text')
+
+    def __init__(self, convert, arg_text):
+        self.convert = convert
+        self.arg_text = arg_text
+
+    def __call__(self):
+        return self.convert()
+
+
+def _arg_text(value):
+    if type(value) is Lazy and type(value.func) is _DeferredConversion:
+        return value.func.arg_text
+    return value
 
 
 def _arg_to_subcmd(arg):
@@ -32,7 +201,7 @@ def _arg_to_subcmd(arg):
 def _multi_error(flag, arg_val_list):
     "Raise a DuplicateFlag if more than one value is specified for an argument"
     if len(arg_val_list) > 1:
-        raise DuplicateFlag.from_parse(flag, arg_val_list)
+        raise DuplicateFlag.from_parse(flag, [_arg_text(v) for v in arg_val_list])
     return arg_val_list[0]
 
 
@@ -48,6 +217,52 @@ def _multi_override(flag, arg_val_list):
 
 # TODO: _multi_ignore?
 
+# these don't inspect values, so they're safe to call with Lazy values
+_BUILTIN_MULTIS = (_multi_error, _multi_extend, _multi_override)
+
+
+def _resolve_all(values):
+    return [resolve_lazy(v) for v in values]
+
+
+class DeferredFlagDict(OrderedDict):
+    """The :attr:`CommandParseResult.flags` of a Parser with
+    ``defer_conversion=True``. Flag values are converted the first
+    time they are read, raising :exc:`~face.InvalidFlagArgument` if
+    the conversion fails.
+    """
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if type(value) is Lazy:
+            value = value.get()
+            super().__setitem__(key, value)
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return ItemsView(self)
+
+    def values(self):
+        return ValuesView(self)
+
+    def raw_items(self):
+        "Returns (name, value) pairs, without converting deferred values."
+        return list(super().items())
+
+    def copy(self):
+        return self.__class__(self.raw_items())
+
+    def __eq__(self, other):
+        return OrderedDict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.raw_items()!r})'
+
 _MULTI_SHORTCUTS = {'error': _multi_error,
                     False: _multi_error,
                     'extend': _multi_extend,
@@ -152,7 +367,9 @@ class CommandParseResult:
                'post_posargs_': self.post_posargs,
                'subcommand_': _subparser,
                'command_': self.parser}
-        if self.flags:
+        if isinstance(self.flags, DeferredFlagDict):
+            ret.update(self.flags.raw_items())  # keep values lazy for injection
+        elif self.flags:
             ret.update(self.flags)
 
         prs = self.parser if not self.subcmds else self.parser.subprs_map[self.subcmds]
@@ -169,6 +386,13 @@ class CommandParseResult:
         return format_nonexp_repr(self, ['name', 'argv', 'parser'])
 
 
+def _copy_parse_result(prs_res):
+    # the flags mapping is the only mutable part of a parse result
+    ret = copy.copy(prs_res)
+    ret.flags = prs_res.flags.copy()
+    return ret
+
+
 # TODO: allow name="--flag / -F" and do the split for automatic
 # char form?
 class Flag:
@@ -207,6 +431,8 @@ class Flag:
          customize the label, and pass a FlagDisplay instance for full
          customizability.
     """
+    __slots__ = ('name', 'doc', 'parse_as', 'missing', 'multi', 'char', '_display')
+
     def __init__(self, name, parse_as=str, missing=None, multi='error',
                  char=None, doc=None, display=None):
         self.name = flag_to_identifier(name)
@@ -236,7 +462,10 @@ class Flag:
         customizability.
         """
         if display is None:
-            display = {}
+            # the default display is created on first access, as most
+            # flags are never displayed in a given run
+            self._display = None
+            return
         elif isinstance(display, bool):
             display = {'hidden': not display}
         elif isinstance(display, str):
@@ -247,7 +476,17 @@ class Flag:
             raise TypeError('expected bool, text name, dict of display'
                             ' options, or FlagDisplay instance, not: %r'
                             % display)
-        self.display = display
+        self._display = display
+
+    @property
+    def display(self):
+        if self._display is None:
+            self._display = FlagDisplay(self)
+        return self._display
+
+    @display.setter
+    def display(self, display):
+        self.set_display(display)
 
     def __repr__(self):
         return format_nonexp_repr(self, ['name', 'parse_as'], ['missing', 'multi'],
@@ -288,6 +527,9 @@ class FlagDisplay:
          string to override the sort order.
 
     """
+    __slots__ = ('flag', '_doc', 'post_doc', 'full_doc', 'value_name',
+                 'group', '_hide', 'label', 'sort_key')
+
     # value_name -> arg_name?
     def __init__(self, flag, *,
                  label: Optional[str] = None,
@@ -298,13 +540,7 @@ class FlagDisplay:
                  hidden: bool = False,
                  sort_key: int = 0):
         self.flag = flag
-
-        self.doc = flag.doc
-        if self.doc is None and callable(flag.parse_as):
-            _prep, desc = get_type_desc(flag.parse_as)
-            self.doc = 'Parsed with ' + desc
-            if _prep == 'as':
-                self.doc = desc
+        self._doc = _UNSET  # see doc property below
 
         self.post_doc = post_doc
         self.full_doc = full_doc
@@ -323,6 +559,22 @@ class FlagDisplay:
         # in the order they are created
         return
 
+    @property
+    def doc(self):
+        # defaults to a description of the flag's type, computed on
+        # first access
+        if self._doc is _UNSET:
+            flag = self.flag
+            self._doc = flag.doc
+            if flag.doc is None and callable(flag.parse_as):
+                _prep, desc = get_type_desc(flag.parse_as)
+                self._doc = desc if _prep == 'as' else 'Parsed with ' + desc
+        return self._doc
+
+    @doc.setter
+    def doc(self, doc):
+        self._doc = doc
+
     @property
     def hidden(self):
         return self._hide or self.label == ''
@@ -348,6 +600,8 @@ class PosArgDisplay:
          often describes default behavior.
 
     """
+    __slots__ = ('name', 'doc', 'post_doc', '_hide', 'label')
+
     def __init__(self, *, 
                  name: Optional[str] = None,
                  doc: str = '',
@@ -393,6 +647,8 @@ class PosArgSpec:
     times around the application.
 
     """
+    __slots__ = ('parse_as', 'min_count', 'max_count', 'provides', 'display')
+
     def __init__(self, parse_as=str, min_count=None, max_count=None, display=None, provides=None, 
                  *, name: Optional[str] = None, count: Optional[int] = None):
         if not callable(parse_as) and parse_as is not ERROR:
@@ -487,6 +743,22 @@ class PosArgSpec:
         if max_count is not None and len_posargs > max_count:
             raise ArgumentArityError('too many arguments, expected %s, got %s'
                                      % (arg_range_text, len_posargs))
+        parse_many = get_parse_many(self.parse_as) if len(posargs) > 1 else None
+        if parse_many is not None:
+            ret, error = _parse_many(parse_many, posargs)
+            if not error:
+                return ret
+            index, exc = error
+            if index is not None:
+                raise InvalidPositionalArgument.from_parse(self, posargs[index], exc)
+            # fall through to find the failing element
+        elif is_io_bound(self.parse_as):
+            results = _call_all([(self.parse_as, pa) for pa in posargs])
+            errors = [InvalidPositionalArgument.from_parse(self, pa, exc)
+                      for pa, (_, exc) in zip(posargs, results) if exc is not None]
+            if errors:
+                raise _combine_errors(errors)
+            return [val for val, _ in results]
         ret = []
         for pa in posargs:
             try:
@@ -554,15 +826,35 @@ class Parser:
           flagfile support. Pass a :class:`Flag` instance to use a
           custom flag instead of ``--flagfile``. Read more about
           Flagfiles below.
+       defer_conversion (bool): Defaults to disabled. Pass ``True`` to
+          only check flags for presence and arguments at parse time,
+          converting each flag's value with its *parse_as* the first
+          time it's read from ``flags_`` or injected. Flags nobody
+          reads are never converted.
+       parse_cache_size (int): Defaults to 0, disabled. Pass a
+          positive number to have :meth:`Parser.parse()` remember the
+          results of up to that many distinct argument lists, for
+          long-running processes which parse the same arguments
+          repeatedly. Only commands whose converters are all pure are
+          cached, see :func:`is_pure`. Cached results are copied
+          before being returned, but flag values are shared between
+          copies, and shouldn't be modified.
 
     Once initialized, parsing is performed by calling
     :meth:`Parser.parse()` with ``sys.argv`` or any other list of strings.
     """
     def __init__(self, name, doc=None, flags=None, posargs=None,
-                 post_posargs=None, flagfile=True, group=None):
+                 post_posargs=None, flagfile=True, group=None, defer_conversion=False,
+                 parse_cache_size=0):
         self.name = process_command_name(name)
         self.doc = doc
         self.group = group
+        self.defer_conversion = defer_conversion
+        self.parse_cache_size = parse_cache_size
+        # argv tuple -> (result, flagfile paths, flagfile state)
+        self._parse_cache = LRU(max_size=parse_cache_size) if parse_cache_size else None
+        # path -> whether all the path's converters are pure
+        self._path_pure_map = {}
         flags = list(flags or [])
 
         self.posargs = _ensure_posargspec(posargs, 'posargs')
@@ -596,7 +888,7 @@ class Parser:
     def get_flags(self, path=(), with_hidden=True):
         flag_map = self.get_flag_map(path=path, with_hidden=with_hidden)
 
-        return unique(flag_map.values())
+        return list(dict.fromkeys(flag_map.values()))
 
     def __repr__(self):
         cn = self.__class__.__name__
@@ -661,6 +953,7 @@ class Parser:
         if isinstance(a[0], Parser):
             subprs = a[0]
             self._add_subparser(subprs)
+            self._clear_caches()
             return
 
         if isinstance(a[0], Flag):
@@ -671,7 +964,29 @@ class Parser:
             except TypeError as te:
                 raise ValueError('expected Parser, Flag, or Flag parameters,'
                                  ' not: %r, %r (got %r)' % (a, kw, te))
-        return self._add_flag(flag)
+        self._add_flag(flag)
+        self._clear_caches()
+        return
+
+    def _clear_caches(self):
+        # called whenever flags or subparsers change
+        if self._parse_cache is not None:
+            self._parse_cache.clear()
+        self._path_pure_map.clear()
+
+    def _is_pure_path(self, path):
+        try:
+            return self._path_pure_map[path]
+        except KeyError:
+            pass
+        prs = self.subprs_map[path] if path else self
+        converters = [prs.posargs.parse_as, prs.post_posargs.parse_as]
+        for flag in self.get_flags(path=path):
+            converters.append(flag.parse_as)
+            if flag.multi not in _BUILTIN_MULTIS:
+                converters.append(flag.multi)
+        ret = self._path_pure_map[path] = all([is_pure(c) for c in converters])
+        return ret
 
     def _add_flag(self, flag):
         # first check there are no conflicts...
@@ -715,6 +1030,90 @@ class Parser:
                   subprocessing. See here for an example.
 
         """
+        if self._parse_cache is None:
+            return self._parse(argv)
+        return self._parse_cached(argv)
+
+    def _parse_cached(self, argv):
+        if argv is None:
+            argv = sys.argv
+        try:
+            key = tuple(argv)
+            entry = self._parse_cache.get(key)
+        except TypeError:
+            return self._parse(argv)  # unhashable args, let _parse() raise
+        if entry is not None:
+            cached, ff_paths, ff_state = entry
+            if _get_flagfile_state(ff_paths) == ff_state:
+                return _copy_parse_result(cached)
+        ff_paths = []
+        ret = self._parse(argv, flagfile_paths=ff_paths)
+        if self._is_pure_path(ret.subcmds):
+            self._parse_cache[key] = (_copy_parse_result(ret), ff_paths,
+                                      _get_flagfile_state(ff_paths))
+        return ret
+
+    def parse_many(self, argvs, errors='raise', processes=None, chunksize=64):
+        """Parse many lists of strings, lazily yielding a
+        :class:`CommandParseResult` for each, in order. Faster than
+        calling :meth:`Parser.parse()` in a loop, as the flag lookup
+        state for each subcommand is only built once per batch.
+
+        Args:
+           argvs (iterable): An iterable of lists of strings, each as
+              would be passed to :meth:`Parser.parse()`.
+           errors (str): Pass ``'raise'`` (the default) to raise the
+              first ArgumentParseError encountered, or ``'yield'`` to
+              yield the error in place of the result and keep going.
+              Yielded errors have a ``prs_res`` attribute holding the
+              partial parse result, including its ``argv``.
+           processes (int): Number of worker processes to parse
+              across, for batches with CPU-heavy converters. Defaults
+              to None, parsing in the current process. Parsed values
+              must be picklable. Workers are forked, and on platforms
+              without ``fork``, parsing happens in the current
+              process.
+           chunksize (int): Number of argument lists sent to a worker
+              process at a time. Defaults to 64.
+
+        The parser should not be modified while a batch is in progress.
+        """
+        if errors not in ('raise', 'yield'):
+            raise ValueError(f"expected errors to be 'raise' or 'yield', not: {errors!r}")
+        if processes is not None:
+            if self.defer_conversion:
+                raise ValueError('processes cannot be used with defer_conversion')
+            import multiprocessing
+            if 'fork' in multiprocessing.get_all_start_methods():
+                return self._parse_many_forked(argvs, errors, processes, chunksize)
+        return self._parse_many(argvs, errors)
+
+    def _parse_many(self, argvs, errors):
+        flag_map_cache = {}
+        for argv in argvs:
+            try:
+                yield self._parse(argv, flag_map_cache)
+            except ArgumentParseError as ape:
+                if errors == 'raise':
+                    raise
+                yield ape
+
+    def _parse_many_forked(self, argvs, errors, processes, chunksize):
+        import multiprocessing
+        ctx = multiprocessing.get_context('fork')
+        with ctx.Pool(processes, initializer=_init_parse_worker, initargs=(self,)) as pool:
+            for prs_res, ape in pool.imap(_parse_in_worker, argvs, chunksize):
+                if ape is not None:
+                    if getattr(ape, 'prs_res', None) is not None:
+                        ape.prs_res.parser = self
+                    if errors == 'raise':
+                        raise ape
+                    yield ape
+                    continue
+                prs_res.parser = self
+                yield prs_res
+
+    def _parse(self, argv, flag_map_cache=None, flagfile_paths=None):
         if argv is None:
             argv = sys.argv
         cpr = CommandParseResult(parser=self, argv=argv)
@@ -751,22 +1150,34 @@ class Parser:
             # NOTE: get_flag_map() is used so that inheritors, like Command,
             # can filter by actually-used arguments, not just
             # available arguments.
-            cmd_flag_map = self.get_flag_map(path=tuple(subcmds))
+            if flag_map_cache is None:
+                cmd_flag_map = self.get_flag_map(path=cpr.subcmds)
+            else:
+                try:
+                    cmd_flag_map = flag_map_cache[cpr.subcmds]
+                except KeyError:
+                    cmd_flag_map = self.get_flag_map(path=cpr.subcmds)
+                    flag_map_cache[cpr.subcmds] = cmd_flag_map
 
             # parse supported flags and validate their arguments
             flag_map, flagfile_map, posargs = self._parse_flags(cmd_flag_map, args)
+            if flagfile_paths is not None:
+                flagfile_paths.extend(flagfile_map)
+            flag_map = self._resolve_pending(cmd_flag_map, flag_map)
             cpr.flags = OrderedDict(flag_map)
             cpr.posargs = tuple(posargs)
 
             # take care of dupes and check required flags
             resolved_flag_map = self._resolve_flags(cmd_flag_map, flag_map, flagfile_map)
-            cpr.flags = OrderedDict(resolved_flag_map)
+            flags_type = DeferredFlagDict if self.defer_conversion else OrderedDict
+            cpr.flags = flags_type(resolved_flag_map)
 
             # separate out any trailing arguments from normal positional arguments
             post_posargs = None  # TODO: default to empty list?
             parsed_post_posargs = None
             if '--' in posargs:
-                posargs, post_posargs = split(posargs, '--', 1)
+                idx = posargs.index('--')
+                posargs, post_posargs = posargs[:idx], posargs[idx + 1:]
                 cpr.posargs, cpr.post_posargs = posargs, post_posargs
 
                 parsed_post_posargs = prs.post_posargs.parse(post_posargs)
@@ -802,7 +1213,7 @@ class Parser:
             ret.append(arg)
         return ret, args[len(ret):]
 
-    def _parse_single_flag(self, cmd_flag_map, args):
+    def _parse_single_flag(self, cmd_flag_map, args, defer=False, context=''):
         advance = 1
         arg = args[0]
         arg_text = None
@@ -826,12 +1237,23 @@ class Parser:
                 advance = 2
         except IndexError:
             raise InvalidFlagArgument.from_parse(cmd_flag_map, flag, arg=None)
+        if flag is not self.flagfile_flag:
+            if self.defer_conversion:
+                convert = partial(self._convert_flag_value, cmd_flag_map, flag, arg_text, context)
+                return flag, Lazy(_DeferredConversion(convert, arg_text)), args[advance:]
+            if defer and is_io_bound(parse_as):
+                return flag, _PendingValue(flag, arg_text), args[advance:]
+        arg_val = self._convert_flag_value(cmd_flag_map, flag, arg_text)
+        return flag, arg_val, args[advance:]
+
+    def _convert_flag_value(self, cmd_flag_map, flag, arg_text, context=''):
         try:
-            arg_val = parse_as(arg_text)
+            return flag.parse_as(arg_text)
         except Exception as e:
-            raise InvalidFlagArgument.from_parse(cmd_flag_map, flag, arg_text, exc=e)
-
-        return flag, arg_val, args[advance:]
+            ife = InvalidFlagArgument.from_parse(cmd_flag_map, flag, arg_text, exc=e)
+            if context:
+                ife.args = (ife.args[0] + context,)
+            raise ife
 
     def _parse_flags(self, cmd_flag_map, args):
         """Expects arguments after the initial command and subcommands (i.e.,
@@ -851,7 +1273,7 @@ class Parser:
             if not arg or arg[0] != '-' or arg == '-' or arg == '--':
                 # posargs or post_posargs beginning ('-' is a conventional pos arg for stdin)
                 break
-            flag, value, args = self._parse_single_flag(cmd_flag_map, args)
+            flag, value, args = self._parse_single_flag(cmd_flag_map, args, defer=True)
             flag_value_map.add(flag.name, value)
 
             if flag is self.flagfile_flag:
@@ -864,6 +1286,23 @@ class Parser:
 
         return flag_value_map, ff_path_res_map, args
 
+    def _resolve_pending(self, cmd_flag_map, flag_value_map):
+        """Convert the values of flags with io_bound converters
+        concurrently, combining any errors into one exception.
+
+        Returns a new multidict of flag names to values."""
+        pending = [v for v in flag_value_map.values(multi=True) if isinstance(v, _PendingValue)]
+        if not pending:
+            return flag_value_map
+        results = _call_all([(pv.flag.parse_as, pv.arg_text) for pv in pending])
+        errors = [InvalidFlagArgument.from_parse(cmd_flag_map, pv.flag, pv.arg_text, exc=exc)
+                  for pv, (_, exc) in zip(pending, results) if exc is not None]
+        if errors:
+            raise _combine_errors(errors)
+        values = iter([val for val, _ in results])
+        return OMD([(name, next(values) if isinstance(value, _PendingValue) else value)
+                    for name, value in flag_value_map.items(multi=True)])
+
     def _parse_flagfile(self, cmd_flag_map, path_or_file, res_map=None):
         ret = res_map if res_map is not None else OrderedDict()
         if callable(getattr(path_or_file, 'read', None)):
@@ -884,11 +1323,12 @@ class Parser:
         ret[path] = cur_file_res = OMD()
         lines = ff_text.splitlines()
         for lineno, line in enumerate(lines, 1):
+            context = f' (on line {lineno} of flagfile "{path}")'
             try:
                 args = shlex.split(line, comments=True)
                 if not args:
                     continue  # comment or empty line
-                flag, value, leftover_args = self._parse_single_flag(cmd_flag_map, args)
+                flag, value, leftover_args = self._parse_single_flag(cmd_flag_map, args, context=context)
 
                 if leftover_args:
                     raise ArgumentParseError('excessive flags or arguments for flag "%s",'
@@ -899,7 +1339,7 @@ class Parser:
                     self._parse_flagfile(cmd_flag_map, value, res_map=ret)
 
             except FaceException as fe:
-                fe.args = (fe.args[0] + f' (on line {lineno} of flagfile "{path}")',)
+                fe.args = (fe.args[0] + context,)
                 raise
 
         return ret
@@ -926,7 +1366,12 @@ class Parser:
             flag = cfm[flag_name]
             arg_val_list = pfm.getlist(flag_name)
             try:
-                ret[flag_name] = flag.multi(flag, arg_val_list)
+                if flag.multi not in _BUILTIN_MULTIS:
+                    arg_val_list = _resolve_all(arg_val_list)
+                value = flag.multi(flag, arg_val_list)
+                if type(value) is list and any([type(v) is Lazy for v in value]):
+                    value = Lazy(partial(_resolve_all, value))
+                ret[flag_name] = value
             except FaceException as fe:
                 ff_paths = []
                 for ff_path, ff_value_map in flagfile_map.items():
@@ -941,6 +1386,30 @@ class Parser:
         return ret
 
 
+_WORKER_STATE = None  # (parser, flag_map_cache) in parse_many() worker processes
+
+
+def _init_parse_worker(parser):
+    global _WORKER_STATE, _IO_EXECUTOR, _IO_EXECUTOR_LOCK
+    # threads don't survive the fork, so the forked executor is unusable
+    _IO_EXECUTOR, _IO_EXECUTOR_LOCK = None, threading.Lock()
+    _WORKER_STATE = (parser, {})
+
+
+def _parse_in_worker(argv):
+    # parsers often hold unpicklable callables, so results are sent
+    # back without one, and the parent process puts its own back
+    parser, flag_map_cache = _WORKER_STATE
+    try:
+        prs_res = parser._parse(argv, flag_map_cache)
+    except ArgumentParseError as ape:
+        if getattr(ape, 'prs_res', None) is not None:
+            ape.prs_res.parser = None
+        return None, ape
+    prs_res.parser = None
+    return prs_res, None
+
+
 def parse_sv_line(line, sep=','):
     """Parse a single line of values, separated by the delimiter
     *sep*. Supports quoting.
@@ -1004,10 +1473,22 @@ class ListParam:
         split_vals = parse_sv_line(list_text, self.sep)
         if self.strip:
             split_vals = [v.strip() for v in split_vals]
+        parse_many = get_parse_many(self.parse_one_as)
+        if parse_many is not None:
+            ret, error = _parse_many(parse_many, split_vals)
+            if not error:
+                return ret
+            index, exc = error
+            if index is not None:
+                raise exc
         return [self.parse_one_as(v) for v in split_vals]
 
     __call__ = parse
 
+    @property
+    def pure(self):
+        return is_pure(self.parse_one_as)
+
     def __repr__(self):
         return format_exp_repr(self, ['parse_one_as'], ['sep', 'strip'])
 
@@ -1038,22 +1519,381 @@ class ChoicesParam:
 
     __call__ = parse
 
+    @property
+    def pure(self):
+        return is_pure(self.parse_as)
+
+    def parse_many(self, texts):
+        "Parse a list of values at once, see :func:`get_parse_many`."
+        parse_many = get_parse_many(self.parse_as)
+        choices = parse_many(texts) if parse_many else [self.parse_as(t) for t in texts]
+        try:
+            choice_set = set(self.choices)
+        except TypeError:
+            choice_set = self.choices  # unhashable choices
+        for i, choice in enumerate(choices):
+            if choice not in choice_set:
+                ape = ArgumentParseError(f'expected one of {self.choices!r}, not: {texts[i]!r}')
+                ape.index = i
+                raise ape
+        return choices
+
     def __repr__(self):
         return format_exp_repr(self, ['choices'], ['parse_as'])
 
 
 class FilePathParam:
-    """TODO
+    """Parses a single argument as a filesystem path, optionally
+    checking that it exists and is the right kind of file.
+
+    Args:
+       exists (bool): Require the path to exist. Defaults to False.
+       kind (str): ``'f'`` to require a file, ``'d'`` to require a
+          directory, or None to accept either. Only checked if the
+          path exists. Defaults to None.
+       abspath (bool): Make the path absolute. Defaults to False.
+       expanduser (bool): Expand a leading ``~``. Defaults to True.
+       role (str): ``'input'`` or ``'output'``, marking the path as
+          read or written by the command, for use with
+          :func:`face.incremental_middleware`. Defaults to None.
+    """
+    io_bound = True
+
+    def __init__(self, exists=False, kind=None, abspath=False, expanduser=True, role=None):
+        if kind not in (None, 'f', 'd'):
+            raise ValueError(f"expected kind to be 'f', 'd', or None, not: {kind!r}")
+        if role not in (None, 'input', 'output'):
+            raise ValueError(f"expected role to be 'input', 'output', or None, not: {role!r}")
+        self.exists = exists
+        self.kind = kind
+        self.abspath = abspath
+        self.expanduser = expanduser
+        self.role = role
 
-    ideas: exists, minimum permissions, can create, abspath, type=d/f
-    (technically could also support socket, named pipe, and symlink)
+    def parse(self, text):
+        if not text:
+            raise ArgumentParseError('expected a path, not an empty string')
+        path = os.path.expanduser(text) if self.expanduser else text
+        if self.abspath:
+            path = os.path.abspath(path)
+        if not os.path.exists(path):
+            if self.exists:
+                raise ArgumentParseError(f'path does not exist: {text!r}')
+            return path
+        if self.kind == 'f' and not os.path.isfile(path):
+            raise ArgumentParseError(f'expected a file, not: {text!r}')
+        if self.kind == 'd' and not os.path.isdir(path):
+            raise ArgumentParseError(f'expected a directory, not: {text!r}')
+        return path
+
+    __call__ = parse
 
-    could do missing=TEMP, but that might be getting too fancy tbh.
+    def __repr__(self):
+        return format_exp_repr(self, [], ['exists', 'kind', 'abspath', 'expanduser', 'role'])
+
+
+class GlobParam:
+    """Parses a single argument as a glob pattern, like
+    ``'photos/**/*.jpg'``, and expands it without the shell's help,
+    avoiding command-line length limits on large directory trees.
+
+    The parsed value is a :class:`GlobMatches`, which walks the
+    filesystem in parallel each time it is iterated, yielding paths
+    as they are found. Patterns without glob characters yield the
+    path itself, if it exists.
+
+    Args:
+       include (list): Basename patterns, at least one of which must
+          match, e.g., ``['*.jpg', '*.png']``.
+       exclude (list): Basename patterns to skip. Excluded
+          directories are not descended into.
+       kind (str): ``'f'`` to only match files, ``'d'`` for
+          directories, or None for both. Defaults to ``'f'``.
+       with_stat (bool): Yield ``(path, stat_result)`` pairs instead
+          of paths. Defaults to False.
+       workers (int): Number of threads walking directories.
+
+    See :func:`face.utils.iter_glob` for more details.
     """
+    def __init__(self, include=(), exclude=(), kind='f', with_stat=False, workers=None):
+        if kind not in (None, 'f', 'd'):
+            raise ValueError(f"expected kind to be 'f', 'd', or None, not: {kind!r}")
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.kind = kind
+        self.with_stat = with_stat
+        self.workers = workers
 
-class FileValueParam:
+    def parse(self, text):
+        if not text:
+            raise ArgumentParseError('expected a path or glob pattern, not an empty string')
+        pattern = os.path.expanduser(text)
+        root, glob_part = _split_glob(pattern)
+        if glob_part and root and not os.path.isdir(root):
+            raise ArgumentParseError(f'no such directory: {root!r}')
+        return GlobMatches(pattern, self)
+
+    __call__ = parse
+
+    def __repr__(self):
+        return format_exp_repr(self, [], ['include', 'exclude', 'kind', 'with_stat', 'workers'])
+
+
+class GlobMatches:
+    """The value parsed by a :class:`GlobParam`. An iterable of the
+    paths matching *pattern*, walked anew on each iteration.
     """
-    TODO: file with a single value in it, like a pidfile
-    or a password file mounted in. Read in and treated like it
-    was on the argv.
+    def __init__(self, pattern, param):
+        self.pattern = pattern
+        self.param = param
+
+    def __iter__(self):
+        prm = self.param
+        return iter_glob(self.pattern, include=prm.include, exclude=prm.exclude,
+                         kind=prm.kind, with_stat=prm.with_stat, workers=prm.workers)
+
+    def __repr__(self):
+        return format_nonexp_repr(self, ['pattern'])
+
+
+_DISPATCH_CLEANUP = contextvars.ContextVar('face_dispatch_cleanup', default=None)
+
+
+@contextlib.contextmanager
+def _dispatch_scope():
+    # resources opened while parsing are closed when the scope exits,
+    # after the handler returns. see Command.run()
+    with contextlib.ExitStack() as stack:
+        token = _DISPATCH_CLEANUP.set(stack)
+        try:
+            yield stack
+        finally:
+            _DISPATCH_CLEANUP.reset(token)
+
+
+def _add_dispatch_resource(resource):
+    """Exit *resource*, a context manager, when the dispatch
+    exits. Returns False if not parsing within a Command run."""
+    stack = _DISPATCH_CLEANUP.get()
+    if stack is None:
+        return False
+    stack.push(resource)
+    return True
+
+
+class InputFileParam:
+    """Parses a single argument as the path of a readable file, which
+    is opened at parse time. The parsed value is an
+    :class:`~face.files.InputFile`, offering zero-copy access through
+    a read-only memory map, or a buffered reader, both created on
+    first use.
+
+    When run by :meth:`Command.run`, the file is closed after the
+    handler returns. Otherwise, use the InputFile as a context
+    manager, or call its ``close()`` method.
+
+    Args:
+       buffer_size (int): Read buffer size, in bytes. Defaults to 128KB.
+       decompress (bool): Detect gzip, bz2, xz, and zstd compression
+          by the file's magic bytes, and decompress while reading.
+          zstd requires Python 3.14+ or the zstandard package.
+          Defaults to False.
+       threaded (bool): Read (and decompress) ahead on a background
+          thread, overlapping with the handler's work. Defaults to False.
+       stdin (bool): Accept ``-`` to read from stdin. Stdin redirected
+          from a regular file can be memory-mapped, while piped and
+          terminal stdin can only be read through the ``reader``.
+          Defaults to True.
     """
+    display_name = 'input file'
+    io_bound = True
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, decompress=False, threaded=False, stdin=True):
+        self.buffer_size = buffer_size
+        self.decompress = decompress
+        self.threaded = threaded
+        self.stdin = stdin
+
+    def parse(self, text):
+        if not text:
+            raise ArgumentParseError('expected a file path, not an empty string')
+        kw = {'buffer_size': self.buffer_size,
+              'decompress': self.decompress,
+              'threaded': self.threaded}
+        if text == '-' and self.stdin:
+            # stdin isn't closed with the dispatch
+            ret = InputFile.from_stdin(**kw)
+        else:
+            path = os.path.expanduser(text)
+            if os.path.isdir(path):
+                raise ArgumentParseError(f'expected a file, not a directory: {text!r}')
+            try:
+                fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+            except FileNotFoundError:
+                raise ArgumentParseError(f'no such file: {text!r}')
+            except PermissionError:
+                raise ArgumentParseError(f'permission denied: {text!r}')
+            except OSError as ose:
+                raise ArgumentParseError(f'could not open {text!r}: {ose.strerror}')
+            try:
+                ret = InputFile(path, fd, **kw)
+            except BaseException:
+                os.close(fd)
+                raise
+        _add_dispatch_resource(ret)
+        if ret.compression and not is_compression_supported(ret.compression):
+            ret.close()
+            raise ArgumentParseError(f'{ret.compression}-compressed input is not'
+                                     f' supported without the zstandard package: {text!r}')
+        return ret
+
+    __call__ = parse
+
+    def __repr__(self):
+        return format_exp_repr(self, [], ['buffer_size', 'decompress', 'threaded', 'stdin'])
+
+
+class StdinParam:
+    """Parses the conventional ``-`` argument as standard input,
+    yielding an :class:`~face.files.InputFile` suited to streaming
+    large inputs. The InputFile's ``kind`` reflects whether stdin is
+    a regular file, which is memory-mapped, a pipe, which is read
+    directly with a large buffer, or a tty.
+
+    Lines, records, and chunks are all read as bytes, avoiding the
+    decoding overhead of text-mode :data:`sys.stdin`, and
+    :meth:`~face.files.InputFile.copy_to` passes input through to an
+    output file without copying it into Python where possible.
+
+    Args:
+       buffer_size (int): Read buffer size, in bytes. Defaults to 128KB.
+       decompress (bool): Detect and decompress compressed input, as
+          with :class:`InputFileParam`. Defaults to False.
+       threaded (bool): Read ahead on a background thread. Defaults
+          to False.
+    """
+    display_name = 'stdin'
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, decompress=False, threaded=False):
+        self.buffer_size = buffer_size
+        self.decompress = decompress
+        self.threaded = threaded
+
+    def parse(self, text):
+        if text != '-':
+            raise ArgumentParseError(f"expected '-' for stdin, not: {text!r}")
+        ret = InputFile.from_stdin(buffer_size=self.buffer_size,
+                                   decompress=self.decompress,
+                                   threaded=self.threaded)
+        _add_dispatch_resource(ret)
+        if ret.compression and not is_compression_supported(ret.compression):
+            ret.close()
+            raise ArgumentParseError(f'{ret.compression}-compressed input is not'
+                                     ' supported without the zstandard package')
+        return ret
+
+    __call__ = parse
+
+    def __repr__(self):
+        return format_exp_repr(self, [], ['buffer_size', 'decompress', 'threaded'])
+
+
+class OutputFileParam:
+    """Parses a single argument as the path of a file to be written.
+    The parsed value is an :class:`~face.files.OutputFile`, whose
+    writer writes to a temporary file in the same directory. When run
+    by :meth:`Command.run`, the temporary file atomically replaces the
+    destination once the handler returns successfully, and is removed
+    if the handler raises an exception.
+
+    Args:
+       buffer_size (int): Write buffer size, in bytes. Defaults to 1MB.
+       fsync (bool): Flush the file to disk before moving it into
+          place, for durability across power loss. Defaults to False.
+       stdout (bool): Accept ``-`` to write to stdout. Defaults to True.
+    """
+    display_name = 'output file'
+    io_bound = True
+
+    def __init__(self, buffer_size=DEFAULT_WRITE_BUFFER_SIZE, fsync=False, stdout=True):
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self.stdout = stdout
+
+    def parse(self, text):
+        if not text:
+            raise ArgumentParseError('expected a file path, not an empty string')
+        if text == '-' and self.stdout:
+            path = text
+        else:
+            path = os.path.expanduser(text)
+            if os.path.isdir(path):
+                raise ArgumentParseError(f'expected a file, not a directory: {text!r}')
+            dest_dir = os.path.dirname(os.path.abspath(path))
+            if not os.path.isdir(dest_dir):
+                raise ArgumentParseError(f'no such directory: {dest_dir!r}')
+            if not os.access(dest_dir, os.W_OK):
+                raise ArgumentParseError(f'permission denied: {dest_dir!r}')
+        ret = OutputFile(path, buffer_size=self.buffer_size, fsync=self.fsync)
+        _add_dispatch_resource(ret)
+        return ret
+
+    __call__ = parse
+
+    def __repr__(self):
+        return format_exp_repr(self, [], ['buffer_size', 'fsync', 'stdout'])
+
+
+class FileValueParam:
+    """Parses a single argument as the path of a file containing a
+    value, like a pidfile or a mounted password file, and reads it in
+    as if the value had been passed on the command line.
+
+    Reads are cached for the life of the process, and files are only
+    reread when they change, so long-running processes can run
+    commands repeatedly without rereading unchanged secrets.
+
+    Args:
+       parse_as (callable): Parses the file's text into a value.
+          Defaults to str.
+       strip (bool): Whether to strip leading and trailing whitespace,
+          such as a trailing newline, before parsing. Defaults to True.
+       encoding (str): The file's text encoding. Defaults to utf-8.
+    """
+    io_bound = True
+
+    def __init__(self, parse_as=str, strip=True, encoding='utf-8'):
+        if not callable(parse_as):
+            raise TypeError(f'expected callable for parse_as, not {parse_as!r}')
+        self.parse_as = parse_as
+        self.strip = strip
+        self.encoding = encoding
+
+    def parse(self, path):
+        if not path:
+            raise ArgumentParseError('expected a file path, not an empty string')
+        try:
+            text = read_file_value(os.path.expanduser(path), encoding=self.encoding)
+        except FileNotFoundError:
+            raise ArgumentParseError(f'no such file: {path!r}')
+        except PermissionError:
+            raise ArgumentParseError(f'permission denied: {path!r}')
+        except IsADirectoryError:
+            raise ArgumentParseError(f'expected a file, not a directory: {path!r}')
+        except (OSError, UnicodeDecodeError) as e:
+            raise ArgumentParseError(f'could not read {path!r}: {e}')
+        if self.strip:
+            text = text.strip()
+        try:
+            return self.parse_as(text)
+        except ArgumentParseError:
+            raise
+        except Exception as e:
+            prep, type_desc = get_type_desc(self.parse_as)
+            raise ArgumentParseError(f'contents of {path!r} failed to parse {prep} {type_desc}'
+                                     f' (got error: {e!r})')
+
+    __call__ = parse
+
+    def __repr__(self):
+        return format_exp_repr(self, ['parse_as'], ['strip', 'encoding'])
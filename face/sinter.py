@@ -1,19 +1,55 @@
+import os
 import sys
 import types
+import marshal
+import weakref
 import inspect
 import hashlib
+import tempfile
 import linecache
+import importlib.util
 
 from boltons import iterutils
 from boltons.strutils import camel2under
 from boltons.funcutils import FunctionBuilder
 
+from face.utils import Lazy, resolve_lazy  # in utils, so parsing doesn't import sinter
+
 
 _VERBOSE = False
 _INDENT = '    '
 
+# generated filename -> (source, code object). bounded by the number of
+# distinct chain sources, which is in turn bounded by the number of
+# distinct middleware/handler signature combinations in the process.
+_CODE_CACHE = {}
+
+# optional directory for persisting generated code objects across
+# processes, a la __pycache__. see set_code_cache_dir()
+_CODE_CACHE_DIR = os.environ.get('FACE_CODE_CACHE_DIR') or None
+
+# callable -> FunctionBuilder. signature introspection is by far the
+# most expensive part of building chains, and the same handful of
+# middlewares get introspected for every path and every invocation.
+_FB_CACHE = weakref.WeakKeyDictionary()
+
 
 def get_fb(f, drop_self=True):
+    if not drop_self:
+        return _get_fb(f, drop_self=False)
+    try:
+        return _FB_CACHE[f]
+    except (KeyError, TypeError):
+        pass  # TypeError for unhashable/unweakrefable callables
+    ret = _get_fb(f)
+    try:
+        _FB_CACHE[f] = ret
+    except TypeError:
+        pass
+    return ret
+
+
+def _get_fb(f, drop_self=True):
     # TODO: support partials
     if not (inspect.isfunction(f) or inspect.ismethod(f) or \
             inspect.isbuiltin(f)) and hasattr(f, '__call__'):
@@ -99,10 +135,18 @@ def chain_argspec(func_list, provides, inner_name):
     return required_sofar, optional_sofar
 
 
+def is_async_callable(f):
+    "Returns True if calling *f* returns an awaitable coroutine."
+    if inspect.iscoroutinefunction(f):
+        return True
+    return inspect.iscoroutinefunction(getattr(f, '__call__', None))
+
+
 #funcs[0] = function to call
 #params[0] = parameters to take
 def build_chain_str(funcs, params, inner_name, params_sofar=None, level=0,
-                    func_aliaser=None, func_names=None):
+                    func_aliaser=None, func_names=None, is_async=False,
+                    lazy_names=()):
     if not funcs:
         return ''  # stopping case
     if params_sofar is None:
@@ -110,47 +154,147 @@ def build_chain_str(funcs, params, inner_name, params_sofar=None, level=0,
 
     params_sofar.update(params[0])
     inner_args = get_fb(funcs[0]).args
-    inner_arg_dict = {a: a for a in inner_args}
+    # potentially-lazy values are resolved when passed to a function
+    # which accepts them
+    inner_arg_dict = {a: f'resolve_lazy({a})' if a in lazy_names else a
+                      for a in inner_args}
     inner_arg_items = sorted(inner_arg_dict.items())
     inner_args = ', '.join(['%s=%s' % kv for kv in inner_arg_items
                            if kv[0] in params_sofar])
     outer_indent = _INDENT * level
     inner_indent = outer_indent + _INDENT
     outer_arg_str = ', '.join(params[0])
-    def_str = f'{outer_indent}def {inner_name}({outer_arg_str}):\n'
-    body_str = build_chain_str(funcs[1:], params[1:], inner_name, params_sofar, level + 1)
+    def_kw = 'async def' if is_async else 'def'
+    def_str = f'{outer_indent}{def_kw} {inner_name}({outer_arg_str}):\n'
+    body_str = build_chain_str(funcs[1:], params[1:], inner_name, params_sofar, level + 1,
+                               is_async=is_async, lazy_names=lazy_names)
     #func_name = get_func_name(funcs[0])
     #func_alias = get_inner_func_alias(funcs[0])
     htb_str = f'{inner_indent}__traceback_hide__ = True\n'
-    return_str = f'{inner_indent}return funcs[{level}]({inner_args})\n'
+    call_str = f'funcs[{level}]({inner_args})'
+    if not is_async:
+        return_str = f'{inner_indent}return {call_str}\n'
+    elif is_async_callable(funcs[0]):
+        return_str = f'{inner_indent}return await {call_str}\n'
+    else:
+        # sync functions in an async chain, e.g., a sync middleware
+        # returning the result of an async next_()
+        return_str = (f'{inner_indent}ret = {call_str}\n'
+                      f'{inner_indent}if isawaitable(ret):\n'
+                      f'{inner_indent}{_INDENT}ret = await ret\n'
+                      f'{inner_indent}return ret\n')
     return ''.join([def_str, body_str, htb_str + return_str])
 
 
-def compile_chain(funcs, params, inner_name, verbose=_VERBOSE):
-    call_str = build_chain_str(funcs, params, inner_name)
-    return compile_code(call_str, inner_name, {'funcs': funcs}, verbose=verbose)
+def compile_chain(funcs, params, inner_name, verbose=_VERBOSE, lazy_names=()):
+    # if any layer is async, the whole chain is async
+    is_async = any([is_async_callable(f) for f in funcs])
+    # lazy_names are the injectables which may be passed as a Lazy,
+    # e.g., deferred flag values, see Parser(defer_conversion=True)
+    lazy_names = set(lazy_names) - {inner_name}
+    call_str = build_chain_str(funcs, params, inner_name, is_async=is_async,
+                               lazy_names=lazy_names)
+    env = {'funcs': funcs, 'resolve_lazy': resolve_lazy}
+    if is_async:
+        env['isawaitable'] = inspect.isawaitable
+    return compile_code(call_str, inner_name, env, verbose=verbose)
+
+
+def set_code_cache_dir(path):
+    """Enable persisting compiled chain code objects to the directory
+    at *path*, so that later processes can skip the ``compile()``
+    step, much like ``__pycache__`` does for modules. Pass ``None``
+    to disable. Can also be enabled with the ``FACE_CODE_CACHE_DIR``
+    environment variable.
+
+    Cache entries are keyed and validated by a hash of the generated
+    source, so stale entries are never used. Failures to read or
+    write the cache are silently ignored.
+    """
+    global _CODE_CACHE_DIR
+    _CODE_CACHE_DIR = os.path.abspath(os.path.expanduser(path)) if path else None
+
+
+def _get_code_cache_path(cache_dir, name, code_hash):
+    tag = sys.implementation.cache_tag or 'unknown'
+    return os.path.join(cache_dir, f'sinter-{name}-{code_hash}.{tag}.bin')
+
+
+def _load_cached_code(cache_path, source_digest):
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    header = importlib.util.MAGIC_NUMBER + source_digest
+    if not data.startswith(header):
+        return None
+    try:
+        code = marshal.loads(data[len(header):])
+    except (EOFError, ValueError, TypeError):
+        return None
+    return code if isinstance(code, types.CodeType) else None
+
+
+def _write_cached_code(cache_path, source_digest, code):
+    data = importlib.util.MAGIC_NUMBER + source_digest + marshal.dumps(code)
+    cache_dir = os.path.dirname(cache_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.sinter-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass  # read-only or otherwise unusable cache dirs are not fatal
+    return
+
+
+def _compile_cached(code_str, name, unique_filename, code_hash):
+    cache_dir = _CODE_CACHE_DIR
+    if not cache_dir:
+        return compile(code_str, unique_filename, 'single')
+
+    source_digest = hashlib.sha1(code_str.encode('utf8')).digest()
+    cache_path = _get_code_cache_path(cache_dir, name, code_hash)
+    code = _load_cached_code(cache_path, source_digest)
+    if code is None:
+        code = compile(code_str, unique_filename, 'single')
+        _write_cached_code(cache_path, source_digest, code)
+    return code
 
 
 def compile_code(code_str, name, env=None, verbose=_VERBOSE):
     env = {} if env is None else env
     code_hash = hashlib.sha1(code_str.encode('utf8')).hexdigest()[:16]
     unique_filename = f"<sinter generated {name} {code_hash}>"
-    code = compile(code_str, unique_filename, 'single')
+    cached = _CODE_CACHE.get(unique_filename)
+    if cached is not None and cached[0] == code_str:
+        code = cached[1]
+    else:
+        code = _compile_cached(code_str, name, unique_filename, code_hash)
+        _CODE_CACHE[unique_filename] = (code_str, code)
     if verbose:
         print(code_str)  # pragma: no cover
 
     exec(code, env)
 
-    linecache.cache[unique_filename] = (
-        len(code_str),
-        None,
-        code_str.splitlines(True),
-        unique_filename,
-    )
+    if unique_filename not in linecache.cache:
+        # same source, same filename, so one entry per distinct chain
+        linecache.cache[unique_filename] = (
+            len(code_str),
+            None,
+            code_str.splitlines(True),
+            unique_filename,
+        )
     return env[name]
 
 
-def make_chain(funcs, provides, final_func, preprovided, inner_name):
+def make_chain(funcs, provides, final_func, preprovided, inner_name, lazy_names=()):
     funcs = list(funcs)
     provides = list(provides)
     preprovided = set(preprovided)
@@ -160,5 +304,5 @@ def make_chain(funcs, provides, final_func, preprovided, inner_name):
     unresolved = tuple(reqs - preprovided)
     args = reqs | (preprovided & opts)
     chain = compile_chain(funcs + [final_func],
-                          [args] + provides, inner_name)
+                          [args] + provides, inner_name, lazy_names=lazy_names)
     return chain, set(args), set(unresolved)
@@ -1,12 +1,16 @@
 import io
 import os
+import sys
 from random import shuffle
 
 import pytest
 
-from face import (Command, Flag, ERROR, FlagDisplay, PosArgSpec,
-                  PosArgDisplay, ChoicesParam, CommandLineError,
+from face import (Parser, Command, Flag, ERROR, FlagDisplay, PosArgSpec,
+                  PosArgDisplay, ChoicesParam, GlobParam, InputFileParam, OutputFileParam,
+                  FileValueParam, StdinParam,
+                  CommandLineError, InvalidFlagArgument, DuplicateFlag,
                   ArgumentParseError, echo, prompt, CommandChecker)
+from face.files import is_compression_supported
 from face.utils import format_flag_label, identifier_to_flag, get_minimal_executable
 
 def test_cmd_name():
@@ -63,6 +67,44 @@ def test_flag_name():
     return
 
 
+def test_lazy_display():
+    described = []
+
+    class Port:
+        @property
+        def display_name(self):
+            described.append(self)
+            return 'port'
+
+        def __call__(self, text):
+            return int(text)
+
+    flag = Flag('--port', parse_as=Port())
+    assert flag._display is None
+    assert described == []
+    assert flag.display.doc == 'port'
+    assert flag.display is flag.display
+    assert len(described) == 1
+
+    flag.display = 'PORT'
+    assert flag.display.label == 'PORT'
+    flag.display.doc = 'the port'
+    assert flag.display.doc == 'the port'
+
+    for obj in (flag, flag.display, PosArgSpec(), PosArgDisplay()):
+        with pytest.raises(AttributeError):
+            obj.extra = True
+
+    def handler():
+        """the handler doc
+        """
+
+    cmd = Command(handler)
+    assert cmd._doc is None
+    assert cmd.doc == 'the handler doc'
+    assert Command(handler, doc='explicit').doc == 'explicit'
+
+
 def test_flag_char():
     with pytest.raises(ValueError, match='char flags must be exactly one character'):
         Flag('flag', char='FLAG')
@@ -287,6 +329,482 @@ def test_choices_init():
     assert choices is not choices_param.choices
 
 
+def test_glob_param(tmp_path):
+    for rel_path in ['a.jpg', 'x/b.jpg', 'x/y/c.png', 'x/y/d.txt', '.git/e.jpg']:
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('')
+
+    def _rel(paths):
+        return sorted([os.path.relpath(p, tmp_path).replace(os.sep, '/') for p in paths])
+
+    glob_all = GlobParam(exclude=['.git'], include=['*.jpg', '*.png'])
+    for workers in (1, 4):
+        glob_all.workers = workers
+        assert _rel(glob_all(str(tmp_path / '**'))) == ['a.jpg', 'x/b.jpg', 'x/y/c.png']
+        assert _rel(glob_all(str(tmp_path / '*/*'))) == ['x/b.jpg']
+        assert _rel(glob_all(str(tmp_path / '**/[!a].jpg'))) == ['x/b.jpg']
+    assert _rel(GlobParam(kind='d')(str(tmp_path / '**'))) == ['.git', 'x', 'x/y']
+    assert _rel(GlobParam()(str(tmp_path / 'a.jpg'))) == ['a.jpg']
+    assert list(GlobParam()(str(tmp_path / 'nope.jpg'))) == []
+
+    matches = list(GlobParam(with_stat=True)(str(tmp_path / 'x/*.jpg')))
+    assert matches[0][0].endswith('b.jpg') and matches[0][1].st_size == 0
+
+    # stopping early is fine
+    matches_iter = iter(GlobParam(workers=4)(str(tmp_path / '**')))
+    assert next(matches_iter)
+    matches_iter.close()
+
+    cmd = Command(lambda posargs_: [list(m) for m in posargs_], name='cmd',
+                  posargs=GlobParam(exclude=['.git']))
+    assert cmd.run(['cmd', str(tmp_path / '**/*.jpg')])
+    with pytest.raises(ArgumentParseError, match='no such directory'):
+        cmd.parse(['cmd', str(tmp_path / 'nope/*.jpg')])
+
+
+def test_input_file_param(tmp_path):
+    data_path = tmp_path / 'data.bin'
+    data_path.write_bytes(b'header\nbody\n')
+    empty_path = tmp_path / 'empty.bin'
+    empty_path.write_bytes(b'')
+    opened = []
+
+    def scan(data, posargs_):
+        opened.extend((data,) + posargs_)
+        assert bytes(data.view[:6]) == b'header'
+        assert data.reader.readline() == b'header\n'
+        assert data.view.readonly
+        return [bytes(f.view) for f in posargs_]
+
+    cmd = Command(scan, posargs=InputFileParam())
+    cmd.add('--data', parse_as=InputFileParam(), missing=ERROR)
+    res = cmd.run(['scan', '--data', str(data_path), str(empty_path), str(data_path)])
+    assert res == [b'', b'header\nbody\n']
+    assert len(opened) == 3 and all([f.closed for f in opened])
+
+    with pytest.raises(InvalidFlagArgument, match='valid input file value.*no such file'):
+        cmd.parse(['scan', '--data', str(tmp_path / 'nope.bin')])
+    with pytest.raises(ArgumentParseError, match='as input file.*not a directory'):
+        cmd.parse(['scan', '--data', str(data_path), str(tmp_path)])
+
+    # outside of run, close it yourself
+    with InputFileParam()(str(data_path)) as input_file:
+        assert os.fspath(input_file) == str(data_path)
+        assert input_file.size == 12
+    assert input_file.closed
+    with pytest.raises(ValueError, match='closed'):
+        input_file.view
+
+
+def test_input_file_decompress(tmp_path, monkeypatch):
+    import bz2
+    import gzip
+    import lzma
+
+    content = b''.join([b'line %d\n' % i for i in range(50000)])
+    paths = {}
+    for name, compress in [('gzip', gzip.compress), ('bz2', bz2.compress),
+                           ('xz', lzma.compress), (None, bytes)]:
+        paths[name] = tmp_path / f'log.{name}'
+        paths[name].write_bytes(compress(content))
+
+    for threaded in (False, True):
+        param = InputFileParam(decompress=True, threaded=threaded, buffer_size=4096)
+        for name, path in paths.items():
+            with param(str(path)) as input_file:
+                assert input_file.compression == name
+                assert input_file.reader.read() == content
+        with param(str(paths['gzip'])) as input_file:
+            # closing before reading to the end is fine
+            assert input_file.reader.readline() == b'line 0\n'
+            with pytest.raises(io.UnsupportedOperation, match='gzip-compressed'):
+                input_file.view
+
+    # stdin, with the - convention
+    def count(data):
+        assert data.path == '-'
+        return len(data.reader.read())
+
+    cmd = Command(count)
+    cmd.add('--data', parse_as=InputFileParam(decompress=True), missing=ERROR)
+    monkeypatch.setattr('sys.stdin', io.TextIOWrapper(io.BytesIO(gzip.compress(content))))
+    assert cmd.run(['count', '--data', '-']) == len(content)
+    assert not sys.stdin.closed
+
+    with pytest.raises(ArgumentParseError, match='no such file'):
+        Command(count, posargs=InputFileParam(stdin=False)).parse(['count', '-'])
+
+    zstd_path = tmp_path / 'log.zst'
+    zstd_path.write_bytes(b'\x28\xb5\x2f\xfd' + b'\x00' * 8)
+    if not is_compression_supported('zstd'):
+        with pytest.raises(InvalidFlagArgument, match='zstd-compressed input is not supported'):
+            cmd.parse(['count', '--data', str(zstd_path)])
+
+
+def test_output_file_param(tmp_path):
+    dest_path = tmp_path / 'export.csv'
+    dest_path.write_bytes(b'old')
+    os.chmod(dest_path, 0o640)
+
+    def export(out, fail, empty):
+        if empty:
+            return
+        out.write(b'a,b\n')
+        out.writer.write(b'1,2\n')
+        assert dest_path.read_bytes() == b'old'
+        if fail:
+            raise RuntimeError('crashed mid-write')
+
+    cmd = Command(export)
+    cmd.add('--out', parse_as=OutputFileParam(fsync=True), missing=ERROR)
+    cmd.add('--fail', parse_as=True)
+    cmd.add('--empty', parse_as=True)
+
+    with pytest.raises(RuntimeError):
+        cmd.run(['export', '--out', str(dest_path), '--fail'])
+    assert os.listdir(tmp_path) == ['export.csv']
+    assert dest_path.read_bytes() == b'old'
+
+    cmd.run(['export', '--out', str(dest_path)])
+    assert os.listdir(tmp_path) == ['export.csv']
+    assert dest_path.read_bytes() == b'a,b\n1,2\n'
+    assert os.stat(dest_path).st_mode & 0o777 == 0o640
+
+    # a successful run which writes nothing still replaces the output
+    cmd.run(['export', '--out', str(dest_path), '--empty'])
+    assert os.listdir(tmp_path) == ['export.csv']
+    assert dest_path.read_bytes() == b''
+
+    # --help doesn't convert, so no file is created
+    cmd.run(['export', '--out', str(tmp_path / 'help.csv'), '--help'])
+    assert os.listdir(tmp_path) == ['export.csv']
+
+    stdout_cmd = Command(lambda out: out.write(b'a,b\n'), name='export')
+    stdout_cmd.add('--out', parse_as=OutputFileParam())
+    assert CommandChecker(stdout_cmd).run(['export', '--out', '-']).stdout == 'a,b\n'
+
+    with pytest.raises(InvalidFlagArgument, match='no such directory'):
+        cmd.parse(['export', '--out', str(tmp_path / 'nope' / 'export.csv')])
+    with pytest.raises(InvalidFlagArgument, match='not a directory'):
+        cmd.parse(['export', '--out', str(tmp_path)])
+
+
+def test_file_value_param(tmp_path, monkeypatch):
+    from face import files
+
+    secret_path, port_path = tmp_path / 'token', tmp_path / 'port'
+    secret_path.write_text('hunter2\n')
+    port_path.write_text('nope')
+
+    cmd = Command(lambda token, port: token, name='cmd')
+    cmd.add('--token', parse_as=FileValueParam(), missing=ERROR)
+    cmd.add('--port', parse_as=FileValueParam(int))
+
+    reads = []
+    real_open = open
+    monkeypatch.setattr('builtins.open', lambda *a, **kw: reads.append(a[0]) or real_open(*a, **kw))
+    for _ in range(3):
+        assert cmd.run(['cmd', '--token', str(secret_path)]) == 'hunter2'
+    assert reads == [str(secret_path)]
+
+    # rotated secrets are reread
+    secret_path.write_text('correct horse battery staple\n')
+    os.utime(secret_path, ns=(0, 0))
+    assert cmd.run(['cmd', '--token', str(secret_path)]) == 'correct horse battery staple'
+    assert len(reads) == 2
+    monkeypatch.undo()
+
+    with pytest.raises(InvalidFlagArgument, match='failed to parse as integer'):
+        cmd.parse(['cmd', '--token', str(secret_path), '--port', str(port_path)])
+    with pytest.raises(InvalidFlagArgument, match='no such file'):
+        cmd.parse(['cmd', '--token', str(tmp_path / 'nope')])
+
+    # the same file read with different encodings
+    name_path = tmp_path / 'name'
+    name_path.write_bytes('café'.encode('utf-8'))
+    assert FileValueParam().parse(str(name_path)) == 'café'
+    assert FileValueParam(encoding='latin-1').parse(str(name_path)) == 'cafÃ©'
+
+    files.clear_file_value_cache()
+    assert not files._FILE_VALUE_CACHE
+
+
+def test_stdin_param(tmp_path, monkeypatch):
+    content = b'alpha\nbeta\ngamma'
+    src_path = tmp_path / 'src.txt'
+    src_path.write_bytes(content)
+    opened = []
+
+    def _set_stdin(kind):
+        if kind == 'file':
+            stream = open(src_path, 'rb')
+        elif kind == 'pipe':
+            read_fd, write_fd = os.pipe()
+            os.write(write_fd, content)
+            os.close(write_fd)
+            stream = open(read_fd, 'rb')
+        else:
+            stream = io.BytesIO(content)
+        stdin = io.TextIOWrapper(stream)
+        opened.append(stdin)
+        monkeypatch.setattr('sys.stdin', stdin)
+
+    def filter_cmd(inp, mode, out=None):
+        assert inp.kind == expected_kind
+        if mode == 'lines':
+            return list(inp.iter_lines(keepends=False))
+        elif mode == 'records':
+            return list(inp.iter_records(sep=b'a'))
+        elif mode == 'chunks':
+            return [bytes(c) for c in inp.iter_chunks(4)]
+        elif mode == 'rest':
+            inp.reader.readline()
+        return inp.copy_to(out)
+
+    cmd = Command(filter_cmd, posargs={'parse_as': StdinParam(), 'count': 1, 'provides': 'inp'})
+    cmd.add('--mode', missing='lines')
+    cmd.add('--out', parse_as=OutputFileParam())
+
+    try:
+        for expected_kind in ('file', 'pipe', 'other'):
+            _set_stdin(expected_kind)
+            assert cmd.run(['cmd', '-']) == [b'alpha', b'beta', b'gamma']
+            _set_stdin(expected_kind)
+            assert cmd.run(['cmd', '--mode', 'records', '-']) == [b'', b'lph', b'\nbet', b'\ng', b'mm']
+            _set_stdin(expected_kind)
+            assert cmd.run(['cmd', '--mode', 'chunks', '-']) == [b'alph', b'a\nbe', b'ta\ng', b'amma']
+            _set_stdin(expected_kind)
+            out_path = tmp_path / f'out.{expected_kind}'
+            assert cmd.run(['cmd', '--mode', 'copy', '--out', str(out_path), '-']) == len(content)
+            assert out_path.read_bytes() == content
+            _set_stdin(expected_kind)
+            assert cmd.run(['cmd', '--mode', 'rest', '--out', str(out_path), '-']) == len(content) - 6
+            assert out_path.read_bytes() == b'beta\ngamma'
+            assert not sys.stdin.closed
+    finally:
+        for stdin in opened:
+            stdin.close()
+
+    with pytest.raises(ArgumentParseError, match="expected '-' for stdin"):
+        cmd.parse(['cmd', 'src.txt'])
+
+
+def test_io_bound_converters():
+    import threading
+
+    thread_names = set()
+
+    def make_converter(parties):
+        # each conversion waits for *parties* conversions to be
+        # underway at once, so running them one at a time times out
+        barrier = threading.Barrier(parties, timeout=5)
+
+        def slow_int(text):
+            thread_names.add(threading.current_thread().name)
+            barrier.wait()
+            return int(text)
+        slow_int.io_bound = True
+        return slow_int
+
+    cmd = Command(lambda a, b, posargs_: (a, b, posargs_), name='cmd', posargs=make_converter(2))
+    flag_int = make_converter(3)
+    cmd.add('--a', parse_as=flag_int, multi='extend')
+    cmd.add('--b', parse_as=flag_int)
+
+    res = cmd.run(['cmd', '--a', '1', '--b', '2', '--a', '3'] + [str(i) for i in range(10)])
+    assert res == ([1, 3], 2, tuple(range(10)))
+    assert all([name.startswith('face-parse') for name in thread_names])
+
+    def io_int(text):
+        return int(text)
+    io_int.io_bound = True
+
+    cmd = Command(lambda a, b, posargs_: (a, b, posargs_), name='cmd', posargs=io_int)
+    cmd.add('--a', parse_as=io_int, multi='extend')
+    cmd.add('--b', parse_as=io_int)
+
+    with pytest.raises(InvalidFlagArgument) as exc_info:
+        cmd.parse(['cmd', '--a', 'x', '--b', 'y'])
+    assert str(exc_info.value).startswith('2 arguments failed to parse')
+    assert "'x'" in str(exc_info.value) and "'y'" in str(exc_info.value)
+
+    with pytest.raises(ArgumentParseError, match="(?s)2 arguments failed.*'x'.*'z'"):
+        cmd.parse(['cmd', '1', 'x', '2', 'z'])
+
+
+def test_parse_many():
+    from face import ListParam
+
+    batches = []
+
+    class Timestamp:
+        def __call__(self, text):
+            return float(text)
+
+        def parse_many(self, texts):
+            batches.append(len(texts))
+            return [float(t) for t in texts]
+
+    spec = PosArgSpec(parse_as=Timestamp())
+    assert spec.parse(['1.5', '2', '3']) == [1.5, 2.0, 3.0]
+    assert batches == [3]
+
+    # without an index, the failing element is found one by one
+    with pytest.raises(ArgumentParseError, match="'x'"):
+        spec.parse(['1', 'x', '3'])
+    assert batches == [3, 3]
+    with pytest.raises(ArgumentParseError, match="'4x'"):
+        PosArgSpec(parse_as=int).parse(['1', '2', '4x'])
+
+    # with an index, the batch error is used directly
+    choices = ChoicesParam([1, 2, 3])
+    assert PosArgSpec(parse_as=choices).parse(['1', '3', '3']) == [1, 3, 3]
+    with pytest.raises(ArgumentParseError, match="expected one of .*, not: '4'"):
+        PosArgSpec(parse_as=choices).parse(['1', '4', '2'])
+
+    assert ListParam(int).parse('1,2,3') == [1, 2, 3]
+    assert ListParam(choices).parse('1,2') == [1, 2]
+    with pytest.raises(ValueError, match="'b'"):
+        ListParam(int).parse('1,b')
+    with pytest.raises(ArgumentParseError, match="not: '5'"):
+        ListParam(choices).parse('1,5')
+
+
+def test_defer_conversion(tmp_path):
+    import json
+    from face.parser import DeferredFlagDict
+
+    converted = []
+
+    def load_json(text):
+        converted.append(text)
+        return json.loads(text)
+
+    def handler(schema, flags_):
+        return schema, flags_.get('data')
+
+    cmd = Command(handler, defer_conversion=True)
+    cmd.add('--schema', parse_as=load_json, missing=ERROR)
+    cmd.add('--data', parse_as=load_json)
+    cmd.add('--tag', parse_as=load_json, multi='extend')
+
+    res = cmd.parse(['handler', '--schema', '{}', '--data', '[1]', '--tag', '1', '--tag', '2'])
+    assert isinstance(res.flags, DeferredFlagDict)
+    assert converted == []
+    assert res.flags['tag'] == [1, 2]
+    assert converted == ['1', '2']
+    assert dict(res.flags) == {'schema': {}, 'data': [1], 'tag': [1, 2], 'flagfile': [], 'help': None}
+
+    del converted[:]
+    assert cmd.run(['handler', '--schema', '{}', '--tag', '1']) == ({}, None)
+    assert converted == ['{}']
+
+    # presence and arity are still checked at parse time
+    with pytest.raises(ArgumentParseError, match='missing required'):
+        cmd.parse(['handler'])
+    with pytest.raises(ArgumentParseError, match='expected argument'):
+        cmd.parse(['handler', '--schema'])
+    del converted[:]
+    with pytest.raises(DuplicateFlag) as exc_info:
+        cmd.parse(['handler', '--schema', '{}', '--data', '1', '--data', '2'])
+    assert str(exc_info.value) == 'more than one value was passed for flag "data": \'1\', \'2\''
+    assert converted == []
+
+    # conversion errors surface as usage errors when first used
+    with pytest.raises(CommandLineError, match='flag schema converter .*failed to parse'):
+        cmd.run(['handler', '--schema', '{'], print_error=False)
+
+    flagfile_path = tmp_path / 'flags.txt'
+    flagfile_path.write_text('--schema {}\n--data nope\n')
+    with pytest.raises(CommandLineError, match='flag data .*on line 2 of flagfile'):
+        cmd.run(['handler', '--flagfile', str(flagfile_path)], print_error=False)
+
+
+def test_parser_parse_many():
+    prs = Parser('sched')
+    run = Parser('run', posargs=int)
+    run.add('--retries', parse_as=int, missing=0)
+    prs.add(run)
+    prs.add('--dry-run', parse_as=True)
+
+    argvs = [['sched', 'run', '--retries', '2', '1', '2'],
+             ['sched', '--dry-run'],
+             ['sched', 'run', 'x'],
+             ['sched', 'run', '3']]
+    results = prs.parse_many(argvs, errors='yield')
+    assert not isinstance(results, list)  # lazy
+    results = list(results)
+
+    assert [r.posargs for r in results[:2]] == [(1, 2), ()]
+    assert results[0].flags['retries'] == 2
+    assert results[1].flags['dry_run'] is True
+    assert isinstance(results[2], ArgumentParseError)
+    assert results[2].prs_res.argv == ('sched', 'run', 'x')
+    assert results[3].posargs == (3,)
+
+    with pytest.raises(ArgumentParseError):
+        list(prs.parse_many(argvs))
+    with pytest.raises(ValueError):
+        prs.parse_many(argvs, errors='ignore')
+
+    forked = list(prs.parse_many(argvs, errors='yield', processes=2, chunksize=1))
+    assert [r.flags for r in forked[:2]] == [r.flags for r in results[:2]]
+    assert forked[0].parser is prs
+    assert forked[2].prs_res.parser is prs
+    assert str(forked[2]) == str(results[2])
+    with pytest.raises(ArgumentParseError):
+        list(prs.parse_many(argvs, processes=2))
+
+
+def test_parse_cache(tmp_path):
+    from face import ListParam
+
+    def handler(count, tags, host):
+        return count, tags, host
+
+    cmd = Command(handler, parse_cache_size=2)
+    cmd.add('--count', parse_as=int)
+    cmd.add('--tags', parse_as=ListParam(int))
+    cmd.add('--host')
+
+    argv = ['handler', '--count', '3', '--tags', '1,2']
+    res = cmd.parse(argv)
+    res2 = cmd.parse(argv)
+    assert res2 is not res
+    assert res2.flags == res.flags
+    res2.flags['count'] = 4
+    assert cmd.parse(argv).flags['count'] == 3
+    assert cmd.run(argv) == (3, [1, 2], None)
+    assert len(cmd._parse_cache) == 1
+
+    flagfile_path = tmp_path / 'flags.txt'
+    flagfile_path.write_text('--host a\n')
+    ff_argv = ['handler', '--flagfile', str(flagfile_path)]
+    assert cmd.parse(ff_argv).flags['host'] == 'a'
+    flagfile_path.write_text('--host bb\n')
+    assert cmd.parse(ff_argv).flags['host'] == 'bb'
+
+    # adding flags clears the cache
+    cmd.add('--verbose', parse_as=True)
+    assert len(cmd._parse_cache) == 0
+
+    # impure converters aren't cached
+    def lookup(text):
+        return text.upper()
+
+    cmd = Command(lambda host: host, 'cmd', parse_cache_size=2)
+    cmd.add('--host', parse_as=lookup)
+    cmd.parse(['cmd', '--host', 'x'])
+    assert len(cmd._parse_cache) == 0
+
+    lookup.pure = True
+    cmd = Command(lambda host: host, 'cmd', parse_cache_size=2)
+    cmd.add('--host', parse_as=lookup)
+    assert cmd.run(['cmd', '--host', 'x']) == 'X'
+    assert len(cmd._parse_cache) == 1
+
+
 def test_echo(capsys):
     test_str = 'tést'
     echo(test_str)
@@ -406,4 +924,38 @@ def test_prompt_yn_exported():
     """flush_stdin and prompt_yn must be importable from the top-level face package."""
     from face import flush_stdin, prompt_yn
     assert callable(flush_stdin)
-    assert callable(prompt_yn)
\ No newline at end of file
+    assert callable(prompt_yn)
+
+
+_IMPORT_CHECK = '''
+import sys, json
+import face
+before = set(sys.modules)
+from face import Parser, Flag, ERROR
+print(json.dumps([sorted(before), sorted(set(sys.modules))]))
+'''
+
+
+def test_import_budget():
+    import json
+    import subprocess
+
+    # run in a fresh interpreter, as this one has already imported everything
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=root)
+    out = subprocess.check_output([sys.executable, '-c', _IMPORT_CHECK], env=env)
+    on_import, on_parser = json.loads(out)
+
+    assert not [m for m in on_import if m.startswith('face.')]
+    assert not [m for m in on_import if m.startswith('boltons')]
+
+    # parsing doesn't need help formatting, dispatch, or testing tools
+    heavy = {'face.helpers', 'face.testing', 'face.command', 'face.middleware',
+             'face.sinter', 'asyncio', 'concurrent.futures', 'csv', 'getpass',
+             'gzip', 'bz2', 'lzma', 'mmap', 'tempfile', 'marshal', 'hashlib', 'inspect'}
+    assert not heavy & (set(on_parser) - set(on_import))
+
+    import face
+    assert 'Command' in dir(face)
+    with pytest.raises(AttributeError):
+        face.nonexistent
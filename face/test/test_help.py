@@ -274,4 +274,46 @@ def test_command_group_repr():
 def test_add_command_group_invalid():
     cmd = Command(None, name='app')
     with pytest.raises(TypeError, match='expected CommandGroup instance'):
-        cmd.add_command_group('not a group')
\ No newline at end of file
+        cmd.add_command_group('not a group')
+
+
+def test_help_skips_conversion(tmp_path, capsys):
+    calls = []
+
+    def slow_lookup(text):
+        calls.append(text)
+        return text
+
+    def handler(host, name):
+        return host, name
+
+    cmd = Command(handler, 'svc', version='1.2.3')
+    cmd.add('--host', parse_as=slow_lookup)
+    cmd.add('--name', missing=ERROR)
+
+    flagfile_path = tmp_path / 'missing.flags'
+    cmd.run(['svc', '--host', 'x', '--flagfile', str(flagfile_path), '--help'])
+    out = capsys.readouterr().out
+    assert 'Usage' in out
+    assert '--version' in out
+    assert calls == []
+
+    # a flag's argument is not mistaken for the flag
+    assert cmd.run(['svc', '--name', '--help']) == (None, '--help')
+
+    cmd.run(['svc', '--host=x', '--version'])
+    assert capsys.readouterr().out == 'svc 1.2.3\n'
+    assert calls == []
+
+    # unknown flags before --help still error
+    with pytest.raises(SystemExit):
+        cmd.run(['svc', '--nope', '--help'], print_error=False)
+
+    cmd = Command(handler, 'svc', version=lambda: 'v' + str(len(calls)))
+    cmd.add('--host')
+    cmd.add('--name')
+    cmd.run(['svc', '--version'])
+    assert capsys.readouterr().out == 'svc v0\n'
+
+    with pytest.raises(ValueError, match='conflicts'):
+        cmd.add('--version')
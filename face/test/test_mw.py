@@ -1,8 +1,10 @@
+import os
+import sys
 import time
 
 import pytest
 
-from face import face_middleware, Command, Flag
+from face import face_middleware, Command, Flag, ERROR, ListParam
 
 
 def test_mw_basic_sig():
@@ -87,3 +89,599 @@ def test_check_mw():
 
     with pytest.raises(TypeError, match='provides conflict with reserved face builtins'):
         face_middleware(provides='flags_')(lambda next_: None)
+
+
+def test_mw_chain_cache():
+    import linecache
+
+    @face_middleware(provides='x')
+    def x_mw(next_):
+        return next_(x=1)
+
+    def handler(x):
+        return x
+
+    cmd = Command(handler, middlewares=[x_mw])
+    assert cmd.run(['handler']) == 1
+    wrapped = cmd._path_wrapped_map[()]
+    linecache_size = len(linecache.cache)
+
+    for _ in range(10):
+        assert cmd.run(['handler']) == 1
+    assert cmd._path_wrapped_map[()] is wrapped
+    assert len(linecache.cache) == linecache_size
+
+    @face_middleware
+    def noop_mw(next_):
+        return next_()
+
+    cmd.add(noop_mw)
+    assert cmd.run(['handler']) == 1
+    assert cmd._path_wrapped_map[()] is not wrapped
+
+
+def test_mw_code_cache_dir(tmp_path):
+    from face import sinter
+
+    def handler(cache_flag):
+        return cache_flag
+
+    sinter.set_code_cache_dir(str(tmp_path))
+    try:
+        cmd = Command(handler)
+        cmd.add('--cache-flag', parse_as=int, missing=3)
+        # clear the in-process cache to force the trip to disk
+        sinter._CODE_CACHE.clear()
+        assert cmd.run(['handler']) == 3
+        cache_files = list(tmp_path.iterdir())
+        assert len(cache_files) == 1
+
+        sinter._CODE_CACHE.clear()
+        cmd = Command(handler)
+        cmd.add('--cache-flag', parse_as=int, missing=3)
+        assert cmd.run(['handler', '--cache-flag', '4']) == 4
+        assert list(tmp_path.iterdir()) == cache_files
+
+        # corrupted entries are ignored and rewritten
+        cache_files[0].write_bytes(b'garbage')
+        sinter._CODE_CACHE.clear()
+        cmd = Command(handler)
+        cmd.add('--cache-flag', parse_as=int, missing=3)
+        assert cmd.run(['handler']) == 3
+        assert cache_files[0].read_bytes() != b'garbage'
+    finally:
+        sinter.set_code_cache_dir(None)
+
+
+def test_mw_dep_cycle():
+    @face_middleware(provides='x')
+    def x_mw(next_, y):
+        return next_(x=y)
+
+    @face_middleware(provides='y')
+    def y_mw(next_, x):
+        return next_(y=x)
+
+    def handler(x):
+        return x
+
+    cmd = Command(handler, middlewares=[x_mw, y_mw])
+    with pytest.raises(ValueError, match="dependency cycle.*provided by middleware y_mw"):
+        cmd.get_dep_names()
+
+
+def test_mw_prepare_tree():
+    @face_middleware(provides='x', flags=[Flag('--verbose', parse_as=True)])
+    def x_mw(next_, verbose):
+        return next_(x=verbose)
+
+    cmd = Command(None, 'root', middlewares=[x_mw])
+    for i in range(20):
+        sub = Command(None, f'sub{i}')
+        sub.add(lambda x: x, f'leaf{i}')
+        cmd.add(sub)
+
+    report = cmd.prepare(workers=4)
+    assert len(report) == 20
+    assert all(path[1].startswith('leaf') for path in report)
+    assert all(duration >= 0 for duration in report.values())
+
+    # everything is cached the second time around
+    assert cmd.prepare() == {}
+    assert cmd.run(['root', 'sub3', 'leaf3', '--verbose']) is True
+
+    def bad_leaf(unresolved_arg):
+        return unresolved_arg
+
+    cmd.add(bad_leaf)
+    with pytest.raises(NameError, match="in path: \\('bad_leaf',\\)"):
+        cmd.prepare(workers=4)
+
+
+def test_mw_active():
+    calls = []
+
+    @face_middleware(flags=[Flag('--trace', parse_as=True)], active='trace')
+    def trace_mw(next_, trace):
+        calls.append(trace)
+        return next_()
+
+    @face_middleware(active=lambda flags: flags.get('count') == 2)
+    def count_mw(next_):
+        calls.append('count')
+        return next_()
+
+    def handler(count):
+        return count
+
+    cmd = Command(handler, middlewares=[trace_mw, count_mw])
+    cmd.add('--count', parse_as=int, missing=1)
+
+    assert cmd.run(['handler']) == 1
+    assert calls == []
+    assert cmd.run(['handler', '--trace']) == 1
+    assert calls == [True]
+    del calls[:]
+    assert cmd.run(['handler', '--trace', '--count', '2']) == 2
+    assert sorted(calls, key=str) == [True, 'count']
+    del calls[:]
+    assert cmd.run(['handler', '--count', '2']) == 2
+    assert calls == ['count']
+
+    # the gating flag works even if the middleware doesn't take it
+    @face_middleware(flags=[Flag('--verbose', parse_as=True)], active='verbose')
+    def verbose_mw(next_):
+        calls.append('verbose')
+        return next_()
+
+    del calls[:]
+    cmd = Command(handler, middlewares=[verbose_mw])
+    cmd.add('--count', parse_as=int, missing=1)
+    assert cmd.run(['handler']) == 1
+    assert calls == []
+    assert cmd.run(['handler', '--verbose']) == 1
+    assert calls == ['verbose']
+
+    with pytest.raises(TypeError, match='cannot have provides'):
+        face_middleware(provides='x', active='trace')
+
+    with pytest.raises(TypeError, match='expected flag name or callable'):
+        face_middleware(active=3)
+
+
+def test_mw_async():
+    import asyncio
+
+    from face import UsageError
+
+    @face_middleware(provides='loop')
+    async def loop_mw(next_):
+        return await next_(loop=asyncio.get_running_loop())
+
+    @face_middleware
+    def sync_mw(next_):
+        return next_()
+
+    async def handler(loop, fail=False):
+        await asyncio.sleep(0)
+        if fail:
+            raise UsageError('failed')
+        return loop is asyncio.get_running_loop()
+
+    cmd = Command(handler, middlewares=[sync_mw, loop_mw])
+    cmd.add('--fail', parse_as=True)
+    assert cmd.run(['handler']) is True
+
+    errors = []
+    with pytest.raises(UsageError):
+        cmd.run(['handler', '--fail'], print_error=errors.append)
+    assert errors == ['error: failed']
+
+    async def main():
+        return await cmd.run_async(['handler'])
+
+    assert asyncio.run(main()) is True
+
+    # sync chains work the same through run_async()
+    sync_cmd = Command(lambda: 'sync', 'sync_cmd')
+    assert asyncio.run(sync_cmd.run_async(['sync_cmd'])) == 'sync'
+
+
+def test_mw_providers():
+    import asyncio
+    import threading
+
+    from face import face_provider
+
+    # config and creds are independent, so each waits for the other
+    # to start. run one after the other, they'd time out instead.
+    both_started = threading.Barrier(2, timeout=5)
+    thread_names = set()
+
+    @face_provider
+    def config(config_path='face.yaml'):
+        thread_names.add(threading.current_thread().name)
+        both_started.wait()
+        return {'path': config_path}
+
+    @face_provider(provides='creds')
+    def load_creds():
+        both_started.wait()
+        return 'secret'
+
+    @face_provider
+    def db(config):
+        return 'db:' + config['path']
+
+    def handler(db, creds):
+        return db, creds
+
+    cmd = Command(handler, middlewares=[config, load_creds, db])
+    assert cmd.run(['handler']) == ('db:face.yaml', 'secret')
+    assert cmd.run(['handler']) == ('db:face.yaml', 'secret')
+    assert all([name.startswith('face-provider') for name in thread_names])
+
+    # weak dependencies are only parsed when something else needs them
+    cmd = Command(lambda db, config_path: db, 'strong', middlewares=[config, load_creds, db])
+    cmd.add('--config-path')
+    assert cmd.run(['strong', '--config-path', 'x.yaml']) == 'db:x.yaml'
+
+    @face_provider
+    async def client(creds):
+        await asyncio.sleep(0)
+        return 'client:' + creds
+
+    def async_handler(client, db):
+        return client, db
+
+    cmd = Command(async_handler, middlewares=[config, load_creds, db, client])
+    assert cmd.run(['async_handler']) == ('client:secret', 'db:face.yaml')
+
+    @face_provider
+    def broken():
+        raise RuntimeError('provider failed')
+
+    cmd = Command(lambda broken: broken, 'broken_cmd', middlewares=[broken])
+    with pytest.raises(RuntimeError, match='provider failed'):
+        cmd.run(['broken_cmd'])
+
+    with pytest.raises(TypeError, match='must not take argument "next_"'):
+        face_provider(lambda next_: None)
+
+
+def test_mw_lazy():
+    from face import lazy
+
+    made = []
+
+    def make_client():
+        made.append(1)
+        return 'client'
+
+    @face_middleware(provides='client')
+    def client_mw(next_):
+        return next_(client=lazy(make_client))
+
+    @face_middleware
+    def uses_client_mw(next_, client):
+        assert client == 'client'
+        return next_()
+
+    def version():
+        return 'v1'
+
+    def fetch(client):
+        return client
+
+    cmd = Command(None, 'cmd', middlewares=[client_mw])
+    cmd.add(version)
+    cmd.add(fetch)
+
+    assert cmd.run(['cmd', 'version']) == 'v1'
+    assert made == []
+    assert cmd.run(['cmd', 'fetch']) == 'client'
+    assert made == [1]
+
+    # materialized once per invocation, no matter how many consumers
+    cmd = Command(fetch, middlewares=[uses_client_mw, client_mw])
+    assert cmd.run(['fetch']) == 'client'
+    assert made == [1, 1]
+
+    # providers in the same group get resolved values, too
+    from face import face_provider
+
+    @face_provider
+    def lazy_client():
+        return lazy(make_client)
+
+    @face_provider
+    def api(lazy_client):
+        return 'api:' + lazy_client
+
+    @face_provider
+    def version_info():
+        return 'v1'
+
+    del made[:]
+    cmd = Command(lambda api: api, 'api_cmd', middlewares=[lazy_client, api])
+    assert cmd.run(['api_cmd']) == 'api:client'
+    cmd = Command(lambda version_info: version_info, 'version_cmd',
+                  middlewares=[lazy_client, version_info])
+    assert cmd.run(['version_cmd']) == 'v1'
+    assert made == [1]
+
+    # only names which may be Lazy are resolved in the generated chain
+    def resolves_lazy(cmd):
+        code_objs, names = [cmd._path_wrapped_map[()].__code__], set()
+        while code_objs:
+            code = code_objs.pop()
+            names.update(code.co_names)
+            code_objs.extend([c for c in code.co_consts if hasattr(c, 'co_names')])
+        return 'resolve_lazy' in names
+
+    def echo_name(name):
+        return name
+
+    cmd = Command(echo_name)
+    cmd.add('--name')
+    cmd.prepare()
+    assert not resolves_lazy(cmd)
+
+    cmd = Command(echo_name, defer_conversion=True)
+    cmd.add('--name')
+    cmd.prepare()
+    assert resolves_lazy(cmd)
+    assert cmd.run(['echo-name', '--name', 'x']) == 'x'
+
+    cmd = Command(fetch, middlewares=[client_mw])
+    cmd.prepare()
+    assert resolves_lazy(cmd)
+
+
+def test_mw_resource():
+    from face import face_resource
+    from face.middleware import ResourcePool
+
+    events = []
+
+    class Conn:
+        def __init__(self, path):
+            self.path = path
+            events.append(('open', path))
+
+        def close(self):
+            events.append(('close', self.path))
+
+    @face_resource(provides='conn')
+    def open_conn(db_path):
+        return Conn(db_path)
+
+    def handler(conn):
+        return conn
+
+    cmd = Command(handler, middlewares=[open_conn])
+    cmd.add('--db-path', missing='a.db')
+
+    with cmd:
+        conns = [cmd.run(['handler']) for _ in range(5)]
+        assert all([c is conns[0] for c in conns])
+        other = cmd.run(['handler', '--db-path', 'b.db'])
+        assert other is not conns[0]
+        assert events == [('open', 'a.db'), ('open', 'b.db')]
+    assert sorted(events[2:]) == [('close', 'a.db'), ('close', 'b.db')]
+
+    # usable after close, with a fresh resource
+    assert cmd.run(['handler']) is not conns[0]
+    cmd.close()
+
+    # list-valued factory arguments, and a bounded number of pools
+    @face_resource(provides='conn', max_pools=2)
+    def open_shards(shards):
+        return Conn(tuple(shards))
+
+    shard_cmd = Command(handler, middlewares=[open_shards])
+    shard_cmd.add('--shards', parse_as=ListParam(int), missing=[])
+    del events[:]
+    with shard_cmd:
+        first = shard_cmd.run(['handler', '--shards', '1,2'])
+        assert shard_cmd.run(['handler', '--shards', '1,2']) is first
+        shard_cmd.run(['handler', '--shards', '3'])
+        shard_cmd.run(['handler', '--shards', '4'])
+        assert len(open_shards._pools) == 2
+        assert ('close', (1, 2)) in events
+
+    # idle eviction and max_size
+    made = []
+    pool = ResourcePool(lambda: made.append(1) or object(), max_size=2, idle_timeout=0)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    assert pool._size == 0 and len(made) == 2
+    third = pool.acquire()
+    assert third is not first and len(made) == 3
+    pool.release(third)
+    assert pool.acquire() is not None and pool.acquire() is not None
+    assert pool.acquire(blocking=False) is None
+
+    # concurrent async invocations wait for the resource without
+    # blocking the event loop, which the holder needs to finish
+    import asyncio
+    import threading
+
+    @face_resource
+    def conn():
+        return Conn('async')
+
+    async def async_handler(conn):
+        await asyncio.sleep(0.01)
+        return conn
+
+    async_cmd = Command(async_handler, middlewares=[conn])
+
+    async def run_both():
+        return await asyncio.gather(async_cmd.run_async(['async_handler']),
+                                    async_cmd.run_async(['async_handler']))
+
+    results = []
+    runner = threading.Thread(target=lambda: results.extend(asyncio.run(run_both())), daemon=True)
+    runner.start()
+    runner.join(timeout=5)
+    assert not runner.is_alive()
+    assert results[0] is results[1]  # one connection, used in turn
+    async_cmd.close()
+
+
+def test_mw_result_cache(tmp_path, capsys):
+    from face import cache_middleware
+
+    calls = []
+
+    def report(name, input_path):
+        calls.append(name)
+        print('report for', name)
+        return {'name': name}
+
+    data_path = tmp_path / 'data.csv'
+    data_path.write_text('a,b\n')
+    cache_mw = cache_middleware(str(tmp_path / 'cache'), inputs=['input_path'])
+    cmd = Command(report, middlewares=[cache_mw])
+    cmd.add('--name', missing='x')
+    cmd.add('--input-path', missing=str(data_path))
+
+    assert cmd.run(['report', '--name', 'a']) == {'name': 'a'}
+    assert cmd.run(['report', '--name', 'a']) == {'name': 'a'}
+    assert calls == ['a']
+    assert capsys.readouterr().out == 'report for a\n' * 2
+
+    cmd.run(['report', '--name', 'b'])
+    cmd.run(['report', '--name', 'a', '--refresh'])
+    cmd.run(['report', '--name', 'a', '--no-cache'])
+    assert calls == ['a', 'b', 'a', 'a']
+
+    # input changes invalidate
+    data_path.write_text('a,b\n1,2\n')
+    cmd.run(['report', '--name', 'a'])
+    assert calls == ['a', 'b', 'a', 'a', 'a']
+
+    # size-bounded
+    cache_mw.cache.max_bytes = 0
+    cache_mw.cache.evict()
+    assert not list((tmp_path / 'cache').glob('*.face-cache'))
+
+    # the command's own flags, even ones named like other middlewares', are part of the key
+    def rm(force):
+        calls.append(force)
+        return 'forced' if force else 'safe'
+
+    rm_cmd = Command(rm, middlewares=[cache_mw])
+    rm_cmd.add('--force', parse_as=True)
+    cache_mw.cache.max_bytes = 1024 * 1024
+    del calls[:]
+    assert rm_cmd.run(['rm']) == 'safe'
+    assert rm_cmd.run(['rm', '--force']) == 'forced'
+    assert calls == [None, True]
+
+    # commands sharing a cache don't collide
+    def other(force):
+        return 'other'
+
+    other_cmd = Command(other, middlewares=[cache_mw])
+    other_cmd.add('--force', parse_as=True)
+    assert other_cmd.run(['other']) == 'other'
+
+    # async handlers are cached once awaited
+    async def fetch(name):
+        calls.append(name)
+        print('fetched', name)
+        return name
+
+    fetch_cmd = Command(fetch, middlewares=[cache_mw])
+    fetch_cmd.add('--name')
+    del calls[:]
+    capsys.readouterr()
+    assert fetch_cmd.run(['fetch', '--name', 'z']) == 'z'
+    assert fetch_cmd.run(['fetch', '--name', 'z']) == 'z'
+    assert calls == ['z']
+    assert capsys.readouterr().out == 'fetched z\n' * 2
+
+    # concurrent async invocations each cache only their own output
+    import asyncio
+
+    async def slow_fetch(name):
+        print('start', name)
+        await asyncio.sleep(0.01)
+        print('end', name)
+        return name
+
+    slow_cmd = Command(slow_fetch, middlewares=[cache_mw])
+    slow_cmd.add('--name')
+    orig_stdout = sys.stdout
+
+    async def run_both():
+        return await asyncio.gather(slow_cmd.run_async(['slow_fetch', '--name', 'a']),
+                                    slow_cmd.run_async(['slow_fetch', '--name', 'b']))
+
+    assert asyncio.run(run_both()) == ['a', 'b']
+    assert sys.stdout is orig_stdout
+    capsys.readouterr()
+    assert slow_cmd.run(['slow_fetch', '--name', 'b']) == 'b'
+    assert capsys.readouterr().out == 'start b\nend b\n'
+
+
+def test_mw_incremental(tmp_path):
+    from face import incremental_middleware, FilePathParam, InvalidFlagArgument
+
+    calls = []
+
+    def encode(src, dest, fps):
+        calls.append(src)
+        with open(src) as src_file, open(dest, 'w') as dest_file:
+            dest_file.write(f'{fps}: ' + src_file.read())
+
+    cmd = Command(encode, middlewares=[incremental_middleware(str(tmp_path / 'state.json'))])
+    cmd.add('--src', parse_as=FilePathParam(exists=True, kind='f', role='input'), missing=ERROR)
+    cmd.add('--dest', parse_as=FilePathParam(role='output'), missing=ERROR)
+    cmd.add('--fps', parse_as=int, missing=12)
+
+    src, dest = tmp_path / 'clip.mp4', tmp_path / 'clip.gif'
+    src.write_text('frames')
+    argv = ['encode', '--src', str(src), '--dest', str(dest)]
+    cmd.run(argv)
+    cmd.run(argv)
+    assert len(calls) == 1
+
+    cmd.run(argv + ['--fps', '24'])
+    cmd.run(argv + ['--fps', '24'])
+    assert len(calls) == 2
+
+    cmd.run(argv + ['--fps', '24', '--force'])
+    assert len(calls) == 3
+
+    src.write_text('more frames')
+    os.utime(src, ns=(dest.stat().st_mtime_ns + 10**9,) * 2)
+    cmd.run(argv + ['--fps', '24'])
+    assert len(calls) == 4
+
+    dest.unlink()
+    cmd.run(argv + ['--fps', '24'])
+    assert len(calls) == 5
+
+    # async handlers record their state once awaited
+    async def async_encode(src, dest, fps):
+        encode(src, dest, fps)
+
+    async_cmd = Command(async_encode, middlewares=[incremental_middleware(str(tmp_path / 'async.json'))])
+    async_cmd.add('--src', parse_as=FilePathParam(exists=True, kind='f', role='input'), missing=ERROR)
+    async_cmd.add('--dest', parse_as=FilePathParam(role='output'), missing=ERROR)
+    async_cmd.add('--fps', parse_as=int, missing=12)
+    async_src, async_dest = tmp_path / 'async.mp4', tmp_path / 'async.gif'
+    async_src.write_text('frames')
+    async_argv = ['async_encode', '--src', str(async_src), '--dest', str(async_dest)]
+    async_cmd.run(async_argv)
+    async_cmd.run(async_argv)
+    assert len(calls) == 6
+
+    with pytest.raises(InvalidFlagArgument, match='does not exist'):
+        cmd.parse(['encode', '--src', str(tmp_path / 'nope'), '--dest', str(dest)])
+    with pytest.raises(InvalidFlagArgument, match='expected a file'):
+        cmd.parse(['encode', '--src', str(tmp_path), '--dest', str(dest)])
@@ -3,13 +3,13 @@ from __future__ import annotations
 import os
 import re
 import sys
-import getpass
+import queue
+import fnmatch
+import threading
 import keyword
 import textwrap
 import typing
 
-from boltons.strutils import pluralize, strip_ansi
-from boltons.iterutils import split, unique
 from boltons.typeutils import make_sentinel
 
 import face
@@ -150,6 +150,7 @@ def get_cardinalized_args_label(name, min_count, max_count):
     tmpl = '[%s]' if min_count == 0 else '%s'
     if max_count == 1:
         return tmpl % name
+    from boltons.strutils import pluralize  # deferred, imports gzip, among others
     return tmpl % (pluralize(name) + ' ...')
 
 
@@ -173,6 +174,11 @@ def get_type_desc(parse_as):
         return 'as', FRIENDLY_TYPE_NAMES[parse_as]
     except KeyError:
         pass
+    try:
+        # converters can set a display_name, as for flag errors
+        return 'as', parse_as.display_name
+    except AttributeError:
+        pass
     try:
         # return the type name if it looks like a type
         return 'as', parse_as.__name__
@@ -205,34 +211,60 @@ def unwrap_text(text):
     return '\n\n'.join(all_grafs)
 
 
-def get_rdep_map(dep_map):
+def get_rdep_map(dep_map, labels=None):
     """
     expects and returns a dict of {item: set([deps])}
 
     item can be a string or any other hashable object.
-    """
-    # TODO: the way this is used, this function doesn't receive
-    # information about what functions take what args. this ends up
-    # just being args depending on args, with no mediating middleware
-    # names. this can make circular dependencies harder to debug.
-    ret = {}
-    for key in dep_map:
-        to_proc, rdeps, cur_chain = [key], set(), []
-        while to_proc:
-            cur = to_proc.pop()
-            cur_chain.append(cur)
 
-            cur_rdeps = dep_map.get(cur, [])
+    Transitive dependencies are resolved in a single depth-first,
+    topological pass. Each item's result is memoized, so dependencies
+    shared between items are only walked once.
 
-            if key in cur_rdeps:
-                raise ValueError('dependency cycle: %r recursively depends'
-                                 ' on itself. full dep chain: %r' % (cur, cur_chain))
+    *labels* is an optional mapping of item to a short description
+    (e.g., the name of the middleware which provides it), used to make
+    dependency cycle errors easier to debug.
+    """
+    labels = labels or {}
+    ret = {}
+    for root in dep_map:
+        if root in ret:
+            continue
+        # stack of (item, remaining deps) pairs, plus the current chain
+        # of items, which doubles as the cycle report
+        stack = [(root, iter(dep_map[root]))]
+        chain, in_chain = [root], {root}
+        while stack:
+            cur, deps = stack[-1]
+            for dep in deps:
+                if dep in in_chain:
+                    cycle = chain[chain.index(dep):] + [dep]
+                    chain_text = ' -> '.join([_format_dep_label(c, labels) for c in cycle])
+                    raise ValueError('dependency cycle: %r recursively depends'
+                                     ' on itself. full dep chain: %s' % (dep, chain_text))
+                if dep in dep_map and dep not in ret:
+                    stack.append((dep, iter(dep_map[dep])))
+                    chain.append(dep)
+                    in_chain.add(dep)
+                    break
+            else:
+                # all deps resolved, so this item's rdeps are final
+                stack.pop()
+                chain.pop()
+                in_chain.discard(cur)
+                rdeps = set()
+                for dep in dep_map[cur]:
+                    rdeps.add(dep)
+                    rdeps.update(ret.get(dep, ()))
+                ret[cur] = rdeps
+    return ret
 
-            to_proc.extend([c for c in cur_rdeps if c not in to_proc])
-            rdeps.update(cur_rdeps)
 
-        ret[key] = rdeps
-    return ret
+def _format_dep_label(item, labels):
+    label = labels.get(item)
+    if label is None:
+        return repr(item)
+    return f'{item!r} ({label})'
 
 
 def get_minimal_executable(executable=None, path=None, environ=None):
@@ -268,6 +300,226 @@ def get_minimal_executable(executable=None, path=None, environ=None):
     return executable
 
 
+_GLOB_MAGIC_RE = re.compile(r'[*?[]')
+
+
+def _split_glob(pattern):
+    # split into a literal root directory and the glob part below it
+    parts = re.split(r'[\\/]' if os.sep == '\\' else '/', pattern)
+    for i, part in enumerate(parts):
+        if _GLOB_MAGIC_RE.search(part):
+            root = '/'.join(parts[:i])
+            if not root and i:
+                root = '/'
+            return root, '/'.join(parts[i:])
+    return pattern, ''
+
+
+def _glob_part_to_regex(part):
+    ret, i = [], 0
+    while i < len(part):
+        char = part[i]
+        i += 1
+        if char == '*':
+            ret.append('[^/]*')
+        elif char == '?':
+            ret.append('[^/]')
+        elif char == '[':
+            end = part.find(']', i + 1 if part[i:i + 1] in ('!', ']') else i)
+            if end < 0:
+                ret.append(re.escape(char))
+                continue
+            chars = part[i:end].replace('\\', '\\\\')
+            if chars.startswith('!'):
+                chars = '^' + chars[1:]
+            elif chars.startswith('^'):
+                chars = '\\' + chars
+            ret.append(f'[{chars}]')
+            i = end + 1
+        else:
+            ret.append(re.escape(char))
+    return ''.join(ret)
+
+
+def _glob_to_regex(pattern):
+    regex_parts = []
+    parts = pattern.split('/')
+    for i, part in enumerate(parts):
+        is_last = i == len(parts) - 1
+        if part == '**':
+            regex_parts.append('.*' if is_last else '(?:[^/]+/)*')
+        else:
+            regex_parts.append(_glob_part_to_regex(part) + ('' if is_last else '/'))
+    return re.compile('(?s:' + ''.join(regex_parts) + r')\Z')
+
+
+def _matches_any(name, patterns):
+    return any([fnmatch.fnmatchcase(name, p) for p in patterns])
+
+
+def iter_glob(pattern, include=(), exclude=(), kind=None, with_stat=False, workers=None):
+    """Iterate over paths matching a glob *pattern*, which may contain
+    ``**`` to match any number of directories. Directories are read
+    concurrently with :func:`os.scandir` on *workers* threads, and
+    matches are yielded as they are found, in no particular order.
+
+    Args:
+       pattern (str): A glob pattern, e.g., ``'photos/**/*.jpg'``.
+       include (list): Basename glob patterns, at least one of which
+          must match for a path to be yielded.
+       exclude (list): Basename glob patterns of paths to skip.
+          Excluded directories are not descended into.
+       kind (str): ``'f'`` to only yield files, ``'d'`` for
+          directories, None for both.
+       with_stat (bool): Yield ``(path, stat_result)`` pairs instead
+          of paths. Stat calls are made on the worker threads.
+       workers (int): Number of threads. Defaults to the same as
+          :class:`~concurrent.futures.ThreadPoolExecutor`. Pass 1 to
+          walk serially in the calling thread.
+
+    Symlinked directories are not followed, and unreadable
+    directories are skipped.
+    """
+    root, glob_part = _split_glob(pattern)
+    if not glob_part:
+        if os.path.lexists(root):
+            yield (root, os.stat(root, follow_symlinks=False)) if with_stat else root
+        return
+    regex = _glob_to_regex(glob_part)
+    max_depth = None if '**' in glob_part else glob_part.count('/')
+    if workers is None:
+        workers = min(32, (os.cpu_count() or 1) + 4)
+
+    def _scan(dir_path, rel_dir, depth):
+        # returns (matches, subdirs)
+        matches, subdirs = [], []
+        try:
+            with os.scandir(dir_path or '.') as it:
+                entries = list(it)
+        except OSError:
+            return matches, subdirs
+        for entry in entries:
+            name = entry.name
+            if exclude and _matches_any(name, exclude):
+                continue
+            rel_path = rel_dir + name
+            path = os.path.join(dir_path, name) if dir_path else name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir and (max_depth is None or depth < max_depth):
+                subdirs.append((path, rel_path + '/', depth + 1))
+            if kind == 'f' and is_dir or kind == 'd' and not is_dir:
+                continue
+            if include and not _matches_any(name, include):
+                continue
+            if not regex.match(rel_path):
+                continue
+            if with_stat:
+                try:
+                    matches.append((path, entry.stat(follow_symlinks=False)))
+                except OSError:
+                    continue
+            else:
+                matches.append(path)
+        return matches, subdirs
+
+    start = (root, '', 0)
+    if workers <= 1:
+        stack = [start]
+        while stack:
+            matches, subdirs = _scan(*stack.pop())
+            yield from matches
+            stack.extend(reversed(subdirs))
+        return
+
+    dir_queue, result_queue = queue.Queue(), queue.Queue()
+    stopped = threading.Event()
+    pending = [1]
+    pending_lock = threading.Lock()
+    _DONE = object()
+
+    def _work():
+        while True:
+            item = dir_queue.get()
+            if item is None:
+                return
+            if stopped.is_set():
+                matches, subdirs = [], []
+            else:
+                matches, subdirs = _scan(*item)
+            with pending_lock:
+                pending[0] += len(subdirs) - 1
+                done = pending[0] == 0
+            for subdir in subdirs:
+                dir_queue.put(subdir)
+            if matches:
+                result_queue.put(matches)
+            if done:
+                result_queue.put(_DONE)
+
+    threads = [threading.Thread(target=_work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    dir_queue.put(start)
+    try:
+        while True:
+            matches = result_queue.get()
+            if matches is _DONE:
+                break
+            yield from matches
+    finally:
+        stopped.set()
+        for _ in threads:
+            dir_queue.put(None)
+    return
+
+
+_UNRESOLVED = object()
+
+
+class Lazy:
+    """A thunk for an expensive injectable. Calls *func* with no
+    arguments at most once, the first time :meth:`get()` is called,
+    and caches the result.
+
+    Generated chains call :func:`resolve_lazy` on provided values
+    before passing them to a function which accepts them, so values
+    nobody accepts are never computed.
+    """
+    __slots__ = ('func', '_value', '_lock')
+
+    def __init__(self, func):
+        if not callable(func):
+            raise TypeError(f'expected callable, not: {func!r}')
+        self.func = func
+        self._value = _UNRESOLVED
+        self._lock = threading.Lock()
+
+    @property
+    def resolved(self):
+        return self._value is not _UNRESOLVED
+
+    def get(self):
+        if self._value is _UNRESOLVED:
+            with self._lock:
+                if self._value is _UNRESOLVED:
+                    self._value = self.func()
+        return self._value
+
+    def __repr__(self):
+        cn = self.__class__.__name__
+        return f'<{cn} func={self.func!r} resolved={self.resolved!r}>'
+
+
+def resolve_lazy(value):
+    "Returns the value of *value* if it's a :class:`Lazy`, otherwise *value*."
+    if type(value) is Lazy:
+        return value.get()
+    return value
+
+
 # prompt and echo owe a decent amount of design to click (and
 # pocket_protector)
 def isatty(stream):
@@ -334,6 +586,7 @@ def echo(msg: str | bytes | object, *,
 
     if msg:
         if not enable_color:
+            from boltons.strutils import strip_ansi
             msg = strip_ansi(msg)
         _file.write(msg)
 
@@ -414,6 +667,7 @@ def prompt(label, confirm=None, confirm_label=None, hide_input=False, err=False)
         confirm_label = f'Retype {label.lower()}'
 
     def prompt_func(label):
+        import getpass  # deferred, as most runs never prompt
         func = getpass.getpass if hide_input else raw_input
         try:
             # Write the prompt separately so that we get nice